@@ -0,0 +1,53 @@
+"""Time a full category poll against a simulated wallbox for several request caps.
+
+Every request takes a fixed latency, the pages of one category are
+requested one after the other. Prints the wall time, the number of
+requests and the peak number of requests in flight per cap.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_concurrency.py [latency in seconds]
+"""
+import asyncio
+import sys
+import time
+import urllib.parse
+
+from fake_wallbox import category_page, make_device
+
+CAPS = (1, 2, 3, 4, 8)
+
+
+async def run(max_concurrent_requests: int, latency: float) -> tuple[float, int, int]:
+    """Poll every category once and return the wall time, requests and peak in flight."""
+    device = make_device(max_concurrent_requests=max_concurrent_requests)
+    requests = 0
+    in_flight = 0
+    peak = 0
+
+    async def fake_get(url, allowed_login=True, json_decode=True, **kwargs):
+        nonlocal requests, in_flight, peak
+        requests += 1
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(latency)
+        in_flight -= 1
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        return category_page(query["cat"][0], int(query["offset"][0]))
+
+    device._get = fake_get
+    start = time.perf_counter()
+    await device._get_all_properties_value()
+    elapsed = time.perf_counter() - start
+    await device.async_close()
+    return elapsed, requests, peak
+
+
+async def main(latency: float) -> None:
+    for cap in CAPS:
+        elapsed, requests, peak = await run(cap, latency)
+        print(f"cap {cap}: {elapsed:5.2f} s, {requests} requests, {peak} in flight")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2))
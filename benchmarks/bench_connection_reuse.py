@@ -0,0 +1,105 @@
+"""Count the connections a device opens to a local TLS wallbox over several polls.
+
+Polls a local HTTPS server that answers like a wallbox, once with the
+keepalive timeout of the device (twice the scan interval) and once with a
+keepalive shorter than the interval. Prints the connections opened, the
+requests that reused a connection and the mean time per poll.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_connection_reuse.py
+"""
+import asyncio
+import datetime
+from pathlib import Path
+import ssl
+import tempfile
+import time
+
+from aiohttp import web
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from fake_wallbox import category_page, make_device
+
+from custom_components.alfen_wallbox.const import CATEGORIES
+
+PORT = 8443
+LATENCY = 0.02
+POLLS = 8
+SCAN_INTERVAL = 0.4
+
+
+def write_certificate(directory: Path) -> tuple[Path, Path]:
+    """Write a self-signed certificate for localhost and return the cert and key paths."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / "cert.pem"
+    key_path = directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    return cert_path, key_path
+
+
+async def handle_prop(request: web.Request) -> web.Response:
+    """Answer a prop?cat= request after the latency of the wallbox."""
+    await asyncio.sleep(LATENCY)
+    return web.json_response(
+        category_page(request.query["cat"], int(request.query["offset"])))
+
+
+async def run(keepalive_timeout: float | None) -> tuple[int, int, float]:
+    """Poll every category POLLS times and return the connections, reuses and ms per poll."""
+    device = make_device(f"127.0.0.1:{PORT}", SCAN_INTERVAL)
+    if keepalive_timeout is not None:
+        device._session.connector._keepalive_timeout = keepalive_timeout
+    # a full sweep every poll, like the first polls after a restart
+    device._get_poll_categories = lambda slow: CATEGORIES
+    elapsed = 0.0
+    for _ in range(POLLS):
+        start = time.perf_counter()
+        await device._get_all_properties_value()
+        elapsed += time.perf_counter() - start
+        await asyncio.sleep(SCAN_INTERVAL)
+    await device.async_close()
+    return device.connections_created, device.connections_reused, 1000 * elapsed / POLLS
+
+
+async def main() -> None:
+    app = web.Application()
+    app.router.add_get("/api/prop", handle_prop)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    with tempfile.TemporaryDirectory() as directory:
+        context.load_cert_chain(*write_certificate(Path(directory)))
+    await web.TCPSite(runner, "127.0.0.1", PORT, ssl_context=context).start()
+    try:
+        for label, keepalive_timeout in (
+            ("keepalive 2x interval", None),
+            ("keepalive 0.5x interval", SCAN_INTERVAL / 2),
+        ):
+            created, reused, per_poll = await run(keepalive_timeout)
+            print(f"{label:24} {created:3} connections, {reused:4} reused, {per_poll:6.1f} ms/poll")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""Time reading the state of the sensors before and after the decoder table.
+
+Before, every read of AlfenSensor.state walked an if-chain on the api_param;
+the chain is kept below as the baseline. Now the sensors decode their value
+once per change with the decoder bound at import time and return the cached
+result. This compares the cost of the three per read.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_sensor_state.py
+"""
+import asyncio
+import datetime
+import timeit
+
+from fake_wallbox import make_device
+
+from custom_components.alfen_wallbox import sensor
+from custom_components.alfen_wallbox.sensor import (
+    ALLOWED_PHASE_DICT,
+    DISPLAY_ERROR_DICT,
+    MAIN_STATE_DICT,
+    MODBUS_CONNECTION_STATES_DICT,
+    MODE_3_STAT_DICT,
+    OCPP_BOOT_NOTIFICATION_STATUS_DICT,
+    POWER_STATES_DICT,
+    STATUS_DICT,
+)
+
+READS = 2000
+
+
+def _legacy_custom_transaction_code(entity, socker_number: int):
+    """The key checks of the old AlfenSensor._customTransactionCode.
+
+    The transaction bodies are left out, they are never reached for the
+    sensors with an api_param this benchmark reads.
+    """
+    if entity.entity_description.key == f"custom_tag_socket_{socker_number}":
+        return None
+    if entity.entity_description.key in (f"custom_transaction_socket_{socker_number}_charging", f"custom_transaction_socket_{socker_number}_charged"):
+        return None
+    if entity.entity_description.key in [f"custom_transaction_socket_{socker_number}_charging_time", f"custom_transaction_socket_{socker_number}_charged_time"]:
+        return None
+
+
+def legacy_state(entity):
+    """The old AlfenSensor.state if-chain for the sensors with an api_param, copied verbatim."""
+    # Custom code for transaction and tag
+    for socketNr in [1,2]:
+        value = _legacy_custom_transaction_code(entity, socketNr)
+        if value is not None:
+            return value
+
+
+    prop = entity._device.get_property(entity.entity_description.api_param)
+    if prop is not None:
+        # some exception of return value
+
+        # Display state status
+        if entity.entity_description.api_param in ("3190_1", "3191_1"):
+            if prop.value == 28:
+                return "See error Number"
+            else:
+                return STATUS_DICT.get(prop.value, 'Unknown')
+
+        # meter_reading from w to kWh
+        if entity.entity_description.api_param in ("2221_22", "3221_22"):
+            return round((prop.value / 1000), 2)
+
+        # Car PWM Duty cycle %
+        if entity.entity_description.api_param == "2511_3":
+            return round((prop.value / 100), entity.entity_description.round_digits)
+
+        # change milliseconds to HH:MM:SS
+        if entity.entity_description.key == "uptime":
+            return str(datetime.timedelta(milliseconds=prop.value)).split('.', maxsplit=1)[0]
+
+        if entity.entity_description.key == "uptime_hours":
+            result = 0
+            value = str(datetime.timedelta(milliseconds=prop.value))
+            days = value.split(' day')
+            if len(days) > 1:
+                result = int(days[0]) * 24
+                hours = days[1].split(", ")[1].split(
+                    ':', maxsplit=1)[0]
+            else:
+                hours = value.split(':', maxsplit=1)[0]
+            result += int(hours)
+            return result
+
+        # change milliseconds to d/m/y HH:MM:SS
+        if entity.entity_description.api_param in ("2187_0", "2059_0"):
+            return datetime.datetime.fromtimestamp(prop.value / 1000).strftime("%d/%m/%Y %H:%M:%S")
+
+        # Allowed phase 1 or Allowed Phase 2
+        if (entity.entity_description.api_param == "312E_0") | (entity.entity_description.api_param == "312F_0"):
+            return ALLOWED_PHASE_DICT.get(prop.value, 'Unknown')
+
+        if entity.entity_description.round_digits is not None:
+            return round(prop.value, entity.entity_description.round_digits)
+
+        # mode3_state
+        if entity.entity_description.api_param in ("2501_4", "2502_4"):
+            return MODE_3_STAT_DICT.get(prop.value, 'Unknown')
+
+        # Socket CPRO State
+        if entity.entity_description.api_param in ("2501_3", "2502_3"):
+            return POWER_STATES_DICT.get(prop.value, 'Unknown')
+
+        # Main CSM State
+        if entity.entity_description.api_param in ("2501_1", "2502_1"):
+            return MAIN_STATE_DICT.get(prop.value, 'Unknown')
+
+        # OCPP Boot notification
+        if (entity.entity_description.api_param == "3600_1"):
+            return OCPP_BOOT_NOTIFICATION_STATUS_DICT.get(prop.value, 'Unknown')
+
+        # OCPP Boot notification
+        if (entity.entity_description.api_param == "2540_0"):
+            return MODBUS_CONNECTION_STATES_DICT.get(prop.value, 'Unknown')
+
+        # wallbox display message
+        if entity.entity_description.api_param in ("3190_2", "3191_2"):
+            return str(prop.value) + ': ' + DISPLAY_ERROR_DICT.get(prop.value,  'Unknown')
+
+        # Status code
+        if entity.entity_description.api_param in ("2501_2", "2502_2"):
+            return STATUS_DICT.get(prop.value, 'Unknown')
+
+        return prop.value
+
+
+async def main() -> None:
+    device = make_device()
+    descriptions = [
+        description
+        for description in sensor.ALFEN_SENSOR_TYPES + sensor.ALFEN_SENSOR_DUAL_SOCKET_TYPES
+        if description.api_param is not None
+    ]
+    device._publish([
+        {"id": description.api_param, "value": 11} for description in descriptions
+    ])
+    entities = [sensor.AlfenSensor(device, description) for description in descriptions]
+
+    mismatches = [entity.entity_description.key for entity in entities
+                  if legacy_state(entity) != entity.state]
+    if mismatches:
+        print(f"the baseline differs for {mismatches}")
+
+    for label, read in (
+        ("old if-chain", lambda: [legacy_state(entity) for entity in entities]),
+        ("decode on read", lambda: [entity._get_current_value() for entity in entities]),
+        ("cached state", lambda: [entity.state for entity in entities]),
+    ):
+        elapsed = timeit.timeit(read, number=READS)
+        print(f"{label:15} {elapsed / READS / len(entities) * 1e9:6.0f} ns/read "
+              f"over {len(entities)} sensors")
+
+    await device.async_close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
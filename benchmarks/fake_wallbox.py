@@ -0,0 +1,50 @@
+"""Fake wallbox data and devices shared by the benchmarks."""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.alfen_wallbox.alfen import (  # noqa: E402
+    AlfenCatalog,
+    AlfenDevice,
+    AlfenDeviceInfo,
+)
+from custom_components.alfen_wallbox.const import CATEGORIES  # noqa: E402
+
+# number of properties per category, roughly those of a single socket wallbox
+CATEGORY_SIZES = dict(zip(CATEGORIES, (110, 40, 30, 20, 10, 60, 30, 20, 40, 20, 30)))
+
+# category -> properties as returned by prop?cat=, with ids that do not
+# collide with the ids the integration knows
+PROPERTIES = {
+    cat: [
+        {"id": f"{0x3000 + i * 0x100 + j // 16:04X}_{j % 16:X}",
+         "access": 1, "type": 7, "len": 0, "cat": cat, "value": j}
+        for j in range(CATEGORY_SIZES[cat])
+    ]
+    for i, cat in enumerate(CATEGORIES)
+}
+
+PAGE_SIZE = 32
+
+
+def category_page(cat: str, offset: int) -> dict:
+    """Return a page of a category as the wallbox does."""
+    properties = PROPERTIES[cat]
+    return {"properties": properties[offset:offset + PAGE_SIZE], "total": len(properties)}
+
+
+def make_device(host: str = "127.0.0.1", scan_interval: int = 5, **kwargs) -> AlfenDevice:
+    """Create a device with an empty catalog that is never saved.
+
+    Has to be called from a running event loop, the device opens its own
+    connection pool.
+    """
+    device = AlfenDevice(MagicMock(), host, "bench", "admin", "secret", scan_interval, **kwargs)
+    device.id = "alfen_bench"
+    device.info = AlfenDeviceInfo({
+        "Identity": "ACE0000001", "FWVersion": "6.4.0", "Model": "NG910-60023",
+        "ObjectId": 1, "Type": "Wallbox"})
+    device.catalog = AlfenCatalog(MagicMock(), "bench")
+    return device
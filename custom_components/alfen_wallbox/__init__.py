@@ -13,13 +13,25 @@ from homeassistant.const import (
     CONF_PASSWORD,
     CONF_SCAN_INTERVAL,
     CONF_USERNAME,
+    EVENT_HOMEASSISTANT_CLOSE,
     Platform,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 
 from .alfen import AlfenDevice
-from .const import DOMAIN, TIMEOUT
+from .const import (
+    CONF_IDLE_SCAN_INTERVAL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STALE_TIMEOUT,
+    DEFAULT_IDLE_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_STALE_TIMEOUT,
+    DOMAIN,
+    TIMEOUT,
+)
 
 PLATFORMS = [
     Platform.SENSOR,
@@ -42,17 +54,30 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up Alfen Wallbox from a config entry."""
-    conf = config_entry.data
+    # the options flow overrides the polling settings of the config flow
+    conf = {**config_entry.data, **config_entry.options}
 
     # if CONF_SCAN_INTERVAL not in conf, then we give 5
     device = await alfen_setup(
-        hass, conf[CONF_HOST], conf[CONF_NAME], conf[CONF_USERNAME], conf[CONF_PASSWORD], conf[CONF_SCAN_INTERVAL] if CONF_SCAN_INTERVAL in conf else 5
+        hass, conf[CONF_HOST], conf[CONF_NAME], conf[CONF_USERNAME], conf[CONF_PASSWORD], conf[CONF_SCAN_INTERVAL] if CONF_SCAN_INTERVAL in conf else 5,
+        conf.get(CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT), conf.get(CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL),
+        conf.get(CONF_IDLE_SCAN_INTERVAL, DEFAULT_IDLE_SCAN_INTERVAL),
+        conf.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
     )
     if not device:
         return False
 
+    async def async_close_device(event: Event) -> None:
+        """Close the connections of the device, entries are not unloaded on shutdown."""
+        device.stop()
+        await device.async_close()
+
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, async_close_device))
+
     device.initilize = True
-    await device.async_update()
+    await device.async_load_catalog()
+    await device.async_probe()
     device.get_number_of_socket()
     device.get_licenses()
 
@@ -62,16 +87,25 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
 
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
     device.initilize = False
+    device.start()
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
     return True
 
 
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Reload the entry to apply the new polling options."""
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("async_unload_entry: %s", config_entry)
 
     unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
 
-    hass.data[DOMAIN].pop(config_entry.entry_id)
+    device: AlfenDevice = hass.data[DOMAIN].pop(config_entry.entry_id)
+    device.stop()
+    await device.async_close()
 
     if not hass.data[DOMAIN]:
         hass.data.pop(DOMAIN)
@@ -79,21 +113,24 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     return unload_ok
 
 
-async def alfen_setup(hass: HomeAssistant, host: str, name: str, username: str, password: str, scan_interval:int) -> AlfenDevice | None:
+async def alfen_setup(hass: HomeAssistant, host: str, name: str, username: str, password: str, scan_interval:int, stale_timeout:int, slow_scan_interval:int, idle_scan_interval:int, max_concurrent_requests:int) -> AlfenDevice | None:
     """Create a Alfen instance only once."""
 
+    device = AlfenDevice(hass, host, name, username, password, scan_interval, stale_timeout, slow_scan_interval, idle_scan_interval, max_concurrent_requests)
     try:
         with timeout(TIMEOUT):
-            device = AlfenDevice(hass, host, name, username, password, scan_interval)
             await device.init()
     except asyncio.TimeoutError:
         _LOGGER.debug("Connection to %s timed out", host)
+        await device.async_close()
         raise ConfigEntryNotReady
     except ClientConnectionError as e:
         _LOGGER.debug("ClientConnectionError to %s %s", host, str(e))
+        await device.async_close()
         raise ConfigEntryNotReady
     except Exception as e:  # pylint: disable=broad-except
         _LOGGER.error("Unexpected error creating device %s %s", host, str(e))
+        await device.async_close()
         return None
 
     return device
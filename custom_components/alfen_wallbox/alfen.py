@@ -1,35 +1,48 @@
 """Alfen Wallbox API."""
+import asyncio
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
 import datetime
+from functools import lru_cache
 import json
 import logging
 import ssl
+import time
+from types import MappingProxyType
 
-from aiohttp import ClientResponse
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector, TraceConfig
 from urllib3 import disable_warnings
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
 
 from .const import (
+    ACTIVE_STATUS_CODES,
     ALFEN_PRODUCT_MAP,
     CAT,
-    CAT_COMM,
-    CAT_DISPLAY,
-    CAT_GENERIC,
-    CAT_GENERIC2,
-    CAT_MBUS_TCP,
-    CAT_METER1,
-    CAT_METER2,
-    CAT_METER4,
-    CAT_OCPP,
-    CAT_STATES,
-    CAT_TEMP,
+    CATALOG_SAVE_DELAY,
+    CATALOG_STORAGE_VERSION,
+    CATEGORIES,
     CMD,
+    DEFAULT_IDLE_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_STALE_TIMEOUT,
+    DNS_CACHE_TTL,
     DISPLAY_NAME_VALUE,
     DOMAIN,
+    FAST_CATEGORIES,
     ID,
+    IDS,
+    IDS_MAX_COUNT,
+    IDS_MAX_URL_LENGTH,
     INFO,
+    LEN,
     LICENSES,
+    MAX_CONNECTIONS,
+    MIN_POLL_DEADLINE,
     LOGIN,
     LOGOUT,
     METHOD_GET,
@@ -41,15 +54,280 @@ from .const import (
     PARAM_USERNAME,
     PROP,
     PROPERTIES,
+    STARTUP_IDS,
+    REQUEST_CONNECT_TIMEOUT,
+    REQUEST_READ_TIMEOUT,
+    STATUS_IDS,
+    PROP_SMART_METER_TOTAL,
+    PROP_TRANSACTION,
+    SMART_METER_PHASES,
     TIMEOUT,
     TOTAL,
+    TYPE,
+    TYPE_FLOAT,
+    TYPE_INT,
     VALUE,
+    VIRTUAL_PROPERTY_SOURCES,
+    WATCH_INTERVAL,
 )
 
 POST_HEADER_JSON = {"Content-Type": "application/json"}
 
 _LOGGER = logging.getLogger(__name__)
 
+# categories polled every slow scan interval
+_SLOW_CATEGORIES = frozenset(CATEGORIES).difference(FAST_CATEGORIES)
+
+
+def _append_lines(path: str, lines: list[str]) -> None:
+    """Append the lines to a file."""
+    with open(path, "a", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+class PollDeadlineExceeded(Exception):
+    """Raised when a request of a poll would start after its deadline."""
+
+
+class AlfenProperty:
+    """Representation of a single Alfen property value."""
+
+    __slots__ = ("id", "value", "updated")
+
+    def __init__(self, prop_id: str, value, updated: float) -> None:
+        """Initialize the Alfen property."""
+        self.id = prop_id
+        self.value = value
+        # time.monotonic() of the last time the value was received
+        self.updated = updated
+
+    def __repr__(self) -> str:
+        """Return the representation of the property."""
+        return f"AlfenProperty({self.id}={self.value!r})"
+
+
+@lru_cache(maxsize=None)
+def prop_key(api_param: str) -> int | None:
+    """Return the integer key of a property id, e.g. 2221_A is 0x2221 << 16 | 0xA, None for virtual ids."""
+    index, _, subindex = api_param.partition("_")
+    try:
+        return int(index, 16) << 16 | int(subindex, 16)
+    except ValueError:
+        return None
+
+
+def _index_properties(properties: Iterable[str]) -> tuple[list[int], list[str]]:
+    """Return the sorted integer keys of the property ids and the ids in the same order."""
+    index = sorted((prop_key(api_param), api_param) for api_param in properties
+                   if prop_key(api_param) is not None)
+    return [key for key, _ in index], [api_param for _, api_param in index]
+
+
+class AlfenSnapshot:
+    """Read-only, generation-numbered view of the device properties."""
+
+    __slots__ = ("generation", "properties", "keys", "ids")
+
+    def __init__(self, generation: int, properties: Mapping[str, AlfenProperty], keys: list[int], ids: list[str]) -> None:
+        """Initialize the Alfen snapshot."""
+        self.generation = generation
+        # property id -> property
+        self.properties = properties
+        # sorted integer keys of the API properties and their ids, for range lookups
+        self.keys = keys
+        self.ids = ids
+
+    def get_object(self, index: int) -> list[AlfenProperty]:
+        """Return all subindices of an object index, e.g. 0x2221."""
+        start = bisect_left(self.keys, index << 16)
+        end = bisect_left(self.keys, (index + 1) << 16, start)
+        return [self.properties[api_param] for api_param in self.ids[start:end]]
+
+
+@dataclass
+class AlfenTransaction:
+    """Latest transaction state of a socket, parsed from the transaction log."""
+
+    start_tag: str | None = None
+    start_date: datetime.datetime | None = None
+    start_kwh: float | None = None
+    stop_tag: str | None = None
+    stop_date: datetime.datetime | None = None
+    stop_kwh: float | None = None
+    last_start_date: datetime.datetime | None = None
+    last_start_kwh: float | None = None
+    mv_date: datetime.datetime | None = None
+    mv_kwh: float | None = None
+
+
+def _parse_transaction_date(value: str) -> datetime.datetime | None:
+    """Parse a date of the transaction log."""
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        _LOGGER.debug(f"Invalid transaction date: {value}")
+        return None
+
+
+def _parse_transaction_kwh(value: str) -> float | None:
+    """Parse a kWh value of the transaction log."""
+    try:
+        return float(value)
+    except ValueError:
+        _LOGGER.debug(f"Invalid transaction kWh: {value}")
+        return None
+
+
+class _AlfenCatalogStore(Store):
+    """Store of the catalog, migrates the catalogs of older versions."""
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        """Drop the access code of version 1 from the property metadata."""
+        if old_major_version == 1:
+            old_data["properties"] = {
+                api_param: meta[1:] for api_param, meta in old_data["properties"].items()}
+            old_data.pop("read_only", None)
+        return old_data
+
+
+class AlfenCatalog:
+    """Metadata of the properties of a wallbox, stored per firmware version."""
+
+    def __init__(self, hass: HomeAssistant, identity: str) -> None:
+        """Initialize the Alfen catalog."""
+        self._store = _AlfenCatalogStore(
+            hass, CATALOG_STORAGE_VERSION, f"{DOMAIN}.catalog_{slugify(identity)}")
+        self.firmware_version = None
+        # property id -> [type, len, cat]
+        self.properties: dict[str, list] = {}
+        # True once every category was fetched, so every property id is known
+        self.complete = False
+
+    async def async_load(self, firmware_version: str) -> None:
+        """Load the catalog, unless it was built for another firmware version."""
+        self.firmware_version = firmware_version
+        data = await self._store.async_load()
+        if data is None:
+            return
+        if data["firmware_version"] != firmware_version:
+            _LOGGER.debug(f"Discard catalog of firmware {data['firmware_version']}")
+            return
+        self.properties = data["properties"]
+        # catalogs stored before the flag existed are completed by the next full poll
+        self.complete = data.get("complete", False)
+
+    def update(self, response: list[dict]) -> None:
+        """Add the metadata of the properties that are not known yet."""
+        added = False
+        for resp in response:
+            if resp[ID] in self.properties or CAT not in resp:
+                continue
+            self.properties[resp[ID]] = [resp.get(TYPE), resp.get(LEN), resp[CAT]]
+            added = True
+        if added:
+            self._async_save()
+
+    def set_complete(self) -> None:
+        """Mark the catalog as holding every property of the wallbox."""
+        if not self.complete:
+            self.complete = True
+            self._async_save()
+
+    def _async_save(self) -> None:
+        """Save the catalog after a delay."""
+        if self.firmware_version is not None:
+            self._store.async_delay_save(self._data_to_save, CATALOG_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data to store."""
+        return {
+            "firmware_version": self.firmware_version,
+            "properties": self.properties,
+            "complete": self.complete,
+        }
+
+    def get_type(self, api_param: str) -> int | None:
+        """Return the type code of a property."""
+        meta = self.properties.get(api_param)
+        return None if meta is None else meta[0]
+
+    def get_category(self, api_param: str) -> str | None:
+        """Return the category of a property."""
+        meta = self.properties.get(api_param)
+        return None if meta is None else meta[2]
+
+    def get_category_ids(self, category: str) -> list[str]:
+        """Return the ids of the properties of a category."""
+        return [api_param for api_param, meta in self.properties.items() if meta[2] == category]
+
+
+def _normalize_value(value, type_code: int | None):
+    """Convert a value of the API to the Python type of its type code."""
+    try:
+        if type_code in TYPE_FLOAT:
+            return float(value)
+        if type_code in TYPE_INT:
+            return int(value)
+    except (TypeError, ValueError):
+        _LOGGER.debug(f"Invalid value {value!r} for type {type_code}")
+    return value
+
+
+def _merge_properties(properties: dict[str, AlfenProperty], response: list[dict], now: float, catalog: AlfenCatalog) -> dict[str, tuple]:
+    """Merge an API response into the next properties and return the changes."""
+    changes = {}
+    for resp in response:
+        value = _normalize_value(resp[VALUE], catalog.get_type(resp[ID]))
+        prop = properties.get(resp[ID])
+        if prop is None or prop.value != value:
+            # changed values get a new record, older snapshots keep the old one
+            properties[resp[ID]] = AlfenProperty(resp[ID], value, now)
+            changes[resp[ID]] = (None if prop is None else prop.value, value)
+        else:
+            prop.updated = now
+    return changes
+
+
+def _batch_ids(api_params: Iterable[str], max_length: int, max_count: int = IDS_MAX_COUNT) -> list[str]:
+    """Join the ids into as few comma separated lists of at most max_length and max_count ids as possible."""
+    batches = []
+    batch = []
+    length = 0
+    for api_param in api_params:
+        # account for the comma in front of every id but the first
+        if batch and (length + 1 + len(api_param) > max_length or len(batch) >= max_count):
+            batches.append(",".join(batch))
+            batch = []
+            length = 0
+        length += len(api_param) + (1 if batch else 0)
+        batch.append(api_param)
+    if batch:
+        batches.append(",".join(batch))
+    return batches
+
+
+def _smart_meter_power(properties: Mapping[str, AlfenProperty]) -> list[dict]:
+    """Derive the smart meter power properties from the voltages and currents."""
+    derived = []
+    total = 0
+    for api_param, (voltage_param, current_param) in SMART_METER_PHASES.items():
+        voltage = properties.get(voltage_param)
+        current = properties.get(current_param)
+        # the API reports null or text for the phases a meter does not measure
+        if (voltage is None or current is None
+                or not isinstance(voltage.value, (int, float))
+                or not isinstance(current.value, (int, float))):
+            total = None
+            continue
+        power = voltage.value * current.value
+        derived.append({ID: api_param, VALUE: power})
+        if total is not None:
+            total += power
+    if total is not None:
+        derived.append({ID: PROP_SMART_METER_TOTAL, VALUE: total})
+    return derived
+
 
 class AlfenDevice:
     """Alfen Device."""
@@ -60,37 +338,84 @@ class AlfenDevice:
                  name: str,
                  username: str,
                  password: str,
-                 scan_interval:int) -> None:
+                 scan_interval:int,
+                 stale_timeout:int = DEFAULT_STALE_TIMEOUT,
+                 slow_scan_interval:int = DEFAULT_SLOW_SCAN_INTERVAL,
+                 idle_scan_interval:int = DEFAULT_IDLE_SCAN_INTERVAL,
+                 max_concurrent_requests:int = DEFAULT_MAX_CONCURRENT_REQUESTS) -> None:
         """Init."""
 
         self.host = host
         self.name = name
         self._status = None
-        self._session = async_get_clientsession(hass, verify_ssl=False)
-        self._session.connector._keepalive_timeout = 2 * scan_interval
         self.scan_interval = scan_interval
+        self.stale_timeout = stale_timeout
+        self.slow_scan_interval = slow_scan_interval
+        self.idle_scan_interval = idle_scan_interval
+        # limits the property requests in flight to the wallbox
+        self.max_concurrent_requests = max_concurrent_requests
+        self._request_semaphore = asyncio.Semaphore(max_concurrent_requests)
         self.username = username
         self.info = None
         self.id = None
         if self.username is None:
             self.username = "admin"
         self.password = password
-        self.properties = []
+        self.snapshot = AlfenSnapshot(0, MappingProxyType({}), [], [])
+        # property id -> (old value, new value) of the last poll
+        self.changes: dict[str, tuple] = {}
+        self.catalog: AlfenCatalog | None = None
+        # ids of the properties not updated within the stale timeout
+        self._stale: set[str] = set()
+        # property id -> callbacks of the entities that depend on it
+        self._subscribers: dict[str, list[Callable[[], None]]] = {}
+        # slow poll -> categories and ids to poll, computed again when missing
+        self._poll_categories: dict[bool, tuple[str, ...]] = {}
+        self._poll_ids: dict[bool, list[str]] = {}
+        # time.monotonic() when the configuration categories have to be polled again
+        self._next_slow_poll = 0.0
+        # True while no socket is charging, the meters are polled less often
+        self.idle = False
+        # time.monotonic() when the meter and state categories have to be polled again while idle
+        self._next_fast_poll = 0.0
+        # False when the firmware does not answer prop?ids= requests
+        self._fetch_by_ids = True
+        # True once all categories were fetched, so every property id is known
+        self._full_poll_done = False
+        self._polled_categories: set[str] = set()
+        # categories and prop?ids= lists whose last request failed, retried every poll
+        self._failed_categories: set[str] = set()
+        self._failed_batches: set[str] = set()
+        # ids of the failed requests not received since, their last values are stale
+        self._failed_ids: set[str] = set()
+        # ids the wallbox refused to write since the last login
+        self._refused_writes: set[str] = set()
+        # categories and prop?ids= lists not requested before the deadline, requested first next poll
+        self._deferred_categories: set[str] = set()
+        self._deferred_batches: set[str] = set()
+        # time.monotonic() after which no request of the current poll is started
+        self._poll_deadline = 0.0
+        # watched property id -> (time.monotonic() of the expiry, record the samples)
+        self._watches: dict[str, tuple[float, bool]] = {}
+        self._watch_task: asyncio.Task | None = None
+        # watched property id -> last value written to the watch file
+        self._watch_recorded: dict[str, object] = {}
         self.licenses = []
-        self._session.verify = False
         self.keepLogout = False
         self.wait = False
         self.updating = False
         self.number_socket = 1
         self._hass = hass
         self.max_allowed_phases = 1
-        self.latest_tag = None
+        # socket -> latest transaction state, e.g. "socket 1"
+        self.transactions: dict[str, AlfenTransaction] = {}
         self.transaction_offset = 0
         self.transaction_counter = 0
         self.initilize = False
 
-        # set next update time as current time
-        self.next_update = datetime.datetime.now()
+        # time.monotonic() of the next poll, polls before it are skipped
+        self._next_poll = 0.0
+        self._poll_task: asyncio.Task | None = None
         disable_warnings()
 
         # Default ciphers needed as of python 3.10
@@ -100,28 +425,202 @@ class AlfenDevice:
         context.verify_mode = ssl.CERT_NONE
         self.ssl = context
 
+        # room for the ids in the URL of a prop?ids= request, besides the host and the offset
+        self._ids_max_length = IDS_MAX_URL_LENGTH - len(self.__get_url(f"{PROP}?{IDS}=&{OFFSET}=65535"))
+
+        # the login in flight, every request that gets a 401 waits for it
+        self._login_task: asyncio.Task | None = None
+        # incremented when a login finished
+        self._login_generation = 0
+        # logins sent, and 401 responses that did not need a login of their own
+        self.logins = 0
+        self.logins_avoided = 0
+
+        # connections to the wallbox that were opened and that were reused
+        self.connections_created = 0
+        self.connections_reused = 0
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        # an own pool, so the connections outlive the poll interval without
+        # changing the session other integrations share
+        self._session = ClientSession(
+            connector=TCPConnector(
+                limit_per_host=min(max_concurrent_requests, MAX_CONNECTIONS),
+                keepalive_timeout=2 * scan_interval,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                ssl=context,
+            ),
+            trace_configs=[trace_config],
+        )
+
+    async def _on_connection_create(self, session, context, params) -> None:
+        """Count a new connection to the wallbox."""
+        self.connections_created += 1
+
+    async def _on_connection_reuse(self, session, context, params) -> None:
+        """Count a request sent on an open connection."""
+        self.connections_reused += 1
+
+    async def async_close(self) -> None:
+        """Close the connections to the wallbox."""
+        _LOGGER.debug(
+            f"Close session, {self.connections_reused} requests reused a connection, "
+            f"{self.connections_created} connections were opened")
+        await self._session.close()
+
     async def init(self):
         """Initialize the Alfen API."""
         await self.get_info()
         self.id = f"alfen_{self.name}"
         if self.name is None:
             self.name = f"{self.info.identity} ({self.host})"
+        self.catalog = AlfenCatalog(self._hass, self.info.identity)
+
+    async def async_load_catalog(self):
+        """Load the property catalog stored for the firmware of the wallbox."""
+        await self.catalog.async_load(self.info.firmware_version)
+        # a stored complete catalog allows prop?ids= polls from the first poll
+        self._full_poll_done = self.catalog.complete
+
+    @property
+    def properties(self) -> Mapping[str, AlfenProperty]:
+        """Return the properties of the current snapshot by id."""
+        return self.snapshot.properties
+
+    def get_property(self, api_param) -> AlfenProperty | None:
+        """Get a property by its id."""
+        return self.snapshot.properties.get(api_param)
+
+    def get_property_value(self, api_param, default=None):
+        """Get the value of a property by its id."""
+        prop = self.snapshot.properties.get(api_param)
+        if prop is None:
+            return default
+        return prop.value
+
+    def async_subscribe(self, api_params: Iterable[str], update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback for changes of the given properties."""
+        api_params = tuple(api_params)
+        for api_param in api_params:
+            self._subscribers.setdefault(api_param, []).append(update_callback)
+        self._invalidate_poll_plan()
+
+        def unsubscribe() -> None:
+            for api_param in api_params:
+                self._subscribers[api_param].remove(update_callback)
+                if not self._subscribers[api_param]:
+                    del self._subscribers[api_param]
+            self._invalidate_poll_plan()
+
+        return unsubscribe
+
+    def _invalidate_poll_plan(self) -> None:
+        """Compute the polled categories and ids again before the next poll."""
+        self._poll_categories.clear()
+        self._poll_ids.clear()
+
+    def _get_subscribed_properties(self) -> set[str]:
+        """Get the ids of the API properties used by an enabled entity."""
+        api_params = set()
+        # the charging status decides how often the meters are polled
+        for subscribed in (*self._subscribers, *STATUS_IDS):
+            for api_param in VIRTUAL_PROPERTY_SOURCES.get(subscribed, (subscribed,)):
+                # ids that are not in the catalog after a full poll are not on this wallbox
+                if self.catalog.get_category(api_param) is not None:
+                    api_params.add(api_param)
+        return api_params
+
+    def _get_poll_categories(self, slow: bool) -> tuple[str, ...]:
+        """Get the categories of the tier with a property used by an enabled entity."""
+        tier = CATEGORIES if slow else FAST_CATEGORIES
+        if slow in self._poll_categories:
+            return self._poll_categories[slow]
+        if not self._subscribers or not self._full_poll_done:
+            return tier
+
+        categories = {self.catalog.get_category(api_param)
+                      for api_param in self._get_subscribed_properties()}
+        self._poll_categories[slow] = tuple(cat for cat in tier if cat in categories)
+        _LOGGER.debug(f"Poll categories {self._poll_categories[slow]}")
+        return self._poll_categories[slow]
+
+    def _get_poll_ids(self, slow: bool) -> list[str]:
+        """Get the prop?ids= lists of the tier with the properties used by an enabled entity."""
+        if slow in self._poll_ids:
+            return self._poll_ids[slow]
+        if not self._subscribers or not self._full_poll_done or not self._fetch_by_ids:
+            return []
+
+        api_params = self._get_subscribed_properties()
+        if not slow:
+            api_params = {api_param for api_param in api_params
+                          if self.catalog.get_category(api_param) in FAST_CATEGORIES}
+        self._poll_ids[slow] = _batch_ids(sorted(api_params), self._ids_max_length)
+        _LOGGER.debug(f"Poll ids {self._poll_ids[slow]}")
+        return self._poll_ids[slow]
+
+    def _notify_subscribers(self, api_params: Iterable[str]) -> None:
+        """Call the subscribers of the changed properties once each."""
+        callbacks = {}
+        for api_param in api_params:
+            for update_callback in self._subscribers.get(api_param, ()):
+                callbacks[update_callback] = None
+        for update_callback in callbacks:
+            update_callback()
+
+    def get_object_properties(self, index: int) -> list[AlfenProperty]:
+        """Get all properties of an object index, e.g. 0x2501 for socket 1."""
+        return self.snapshot.get_object(index)
+
+    def is_stale(self, api_param) -> bool:
+        """Return True if the property was not updated within the stale timeout."""
+        return api_param in self._stale
+
+    def is_property_available(self, api_param) -> bool:
+        """Return True if the property has a value that is not stale."""
+        return self.get_property(api_param) is not None and api_param not in self._stale
+
+    def _update_stale(self) -> set[str]:
+        """Update the stale properties and return the ids that changed staleness."""
+        now = time.monotonic()
+        # the meters are only polled every idle scan interval while idle,
+        # the configuration every slow scan interval
+        oldest = now - self.stale_timeout - (self.idle_scan_interval if self.idle else 0)
+        oldest_slow = now - self.stale_timeout - self.slow_scan_interval
+        get_category = self.catalog.get_category
+        stale = set()
+        for prop in self.properties.values():
+            category = get_category(prop.id)
+            if (prop.updated < oldest_slow
+                    or (prop.updated < oldest and category not in _SLOW_CATEGORIES)
+                    # the last values are kept until the failed request is retried
+                    or prop.id in self._failed_ids):
+                stale.add(prop.id)
+        # the virtual properties are derived again on every poll, so they
+        # are as stale as the oldest of their sources
+        for api_param, sources in VIRTUAL_PROPERTY_SOURCES.items():
+            if not stale.isdisjoint(sources) and self.get_property(api_param) is not None:
+                stale.add(api_param)
+        transitions = stale ^ self._stale
+        if transitions:
+            _LOGGER.debug(f"Stale properties {stale}")
+        self._stale = stale
+        return transitions
 
     def get_number_of_socket(self):
         """Get number of socket from the properties."""
-        for prop in self.properties:
-            if prop[ID] == '205E_0':
-                self.number_socket = int(prop[VALUE])
-                break
+        value = self.get_property_value('205E_0')
+        if value is not None:
+            self.number_socket = value
 
     def get_licenses(self):
         """Get licenses from the properties."""
-        for prop in self.properties:
-            if prop[ID] == '21A2_0':
-                for key, value in LICENSES.items():
-                    if int(prop[VALUE]) & int(value):
-                        self.licenses.append(key)
-                break
+        value = self.get_property_value('21A2_0')
+        if value is not None:
+            for key, license_value in LICENSES.items():
+                if value & license_value:
+                    self.licenses.append(key)
 
     async def get_info(self):
         """Get info from the API."""
@@ -160,28 +659,77 @@ class AlfenDevice:
             "sw_version": self.info.firmware_version,
         }
 
-    async def async_update(self):
-        """Update the device properties."""
+    async def async_probe(self) -> None:
+        """Get the properties that decide the entities, all properties are polled in the background."""
+        response = await self._get_prop(f"{PROP}?{IDS}={','.join(STARTUP_IDS)}", time.monotonic() + TIMEOUT)
+        if response is not None and response.get(PROPERTIES):
+            self._publish(response[PROPERTIES])
+            return
+        _LOGGER.debug("Startup probe failed, polling all properties")
+        await self._async_update()
+
+    def start(self) -> None:
+        """Start polling the device in the background."""
+        self._poll_task = self._hass.async_create_background_task(
+            self._async_poll(), f"{DOMAIN} poll {self.name}")
+
+    def stop(self) -> None:
+        """Stop polling the device."""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self.stop_watch()
+
+    async def _async_poll(self) -> None:
+        """Poll the device every scan interval until the task is cancelled."""
+        next_poll = max(self._next_poll, time.monotonic())
+        while True:
+            await asyncio.sleep(next_poll - time.monotonic())
+            try:
+                await self._async_update()
+            except Exception as e:  # pylint: disable=broad-except
+                _LOGGER.error("Unexpected error on poll %s", str(e))
+
+            next_poll += self.scan_interval
+            now = time.monotonic()
+            if next_poll <= now:
+                # the ticks a long poll overran are dropped, polls never overlap
+                missed = int((now - next_poll) // self.scan_interval) + 1
+                _LOGGER.debug(f"Poll overran, skip {missed} ticks")
+                next_poll += missed * self.scan_interval
 
-        # add next update time
-        if self.next_update > datetime.datetime.now():
-            _LOGGER.debug(f"Next update {self.next_update}")
+    async def async_update(self):
+        """Update the device properties, unless they were polled within the scan interval."""
+        if time.monotonic() < self._next_poll:
+            _LOGGER.debug(f"Next update in {self._next_poll - time.monotonic():.1f}s")
             return
+        await self._async_update()
 
+    async def _async_update(self):
+        """Update the device properties."""
         if not self.keepLogout and not self.wait and not self.updating:
+            start = time.monotonic()
             try:
                 self.updating = True
                 await self._get_all_properties_value()
+                self._notify_subscribers(self.changes.keys() | self._update_stale())
 
+                transactions_deferred = False
                 if self.transaction_counter == 0 and not self.initilize:
-                    await self._get_transaction()
-                if not self.initilize:
+                    try:
+                        await self._get_transaction()
+                    except PollDeadlineExceeded:
+                        # the log is read on from the offset reached on the next poll
+                        _LOGGER.debug("Deadline passed, get the transactions on the next poll")
+                        transactions_deferred = True
+                    self._notify_subscribers((PROP_TRANSACTION,))
+                if not self.initilize and not transactions_deferred:
                     self.transaction_counter += 1
 
             finally:
                 self.updating = False
 
-            self.next_update = datetime.datetime.now() + datetime.timedelta(seconds=self.scan_interval)
+            self._next_poll = start + self.scan_interval
             # if the transaction counter is 50, reset it (transaction is only update every 30 sec, so it's about 30 times
             # transaction only update every 15min, so we update very 10minutes
             if self.transaction_counter >= (60 / self.scan_interval) * 10:
@@ -189,6 +737,7 @@ class AlfenDevice:
 
     async def _post(self, cmd, payload=None, allowed_login=True) -> ClientResponse | None:
         """Send a POST request to the API."""
+        login_generation = self._login_generation
         try:
             self.wait = True
             _LOGGER.debug("Send Post Request")
@@ -200,7 +749,7 @@ class AlfenDevice:
                     ssl=self.ssl) as response:
                 if response.status == 401 and allowed_login:
                     _LOGGER.debug("POST with login")
-                    await self.login()
+                    await self._login_after_unauthorized(login_generation)
                     return await self._post(cmd, payload, False)
                 response.raise_for_status()
                 return response
@@ -219,14 +768,15 @@ class AlfenDevice:
             self.wait = False
         return None
 
-    async def _get(self, url, allowed_login=True, json_decode=True) -> ClientResponse | None:
+    async def _get(self, url, allowed_login=True, json_decode=True, request_timeout=TIMEOUT) -> ClientResponse | None:
         """Send a GET request to the API."""
+        login_generation = self._login_generation
         try:
-            async with self._session.get(url, timeout=TIMEOUT, ssl=self.ssl) as response:
+            async with self._session.get(url, timeout=request_timeout, ssl=self.ssl) as response:
                 if response.status == 401 and allowed_login:
                     _LOGGER.debug("GET with login")
-                    await self.login()
-                    return await self._get(url, False)
+                    await self._login_after_unauthorized(login_generation)
+                    return await self._get(url, False, request_timeout=request_timeout)
 
                 response.raise_for_status()
                 if json_decode:
@@ -241,12 +791,38 @@ class AlfenDevice:
             _LOGGER.error("Unexpected error on GET %s", str(e))
             return None
 
+    async def _login_after_unauthorized(self, login_generation: int) -> None:
+        """Login once for all the requests that got a 401, then each retries once."""
+        if login_generation != self._login_generation:
+            # a login finished after the request was sent
+            self.logins_avoided += 1
+            _LOGGER.debug(f"Login finished already, {self.logins_avoided} logins avoided")
+            return
+        if self._login_task is None:
+            self.logins += 1
+            self._login_task = self._hass.async_create_task(self._async_login())
+        else:
+            self.logins_avoided += 1
+            _LOGGER.debug(f"Wait for the login in flight, {self.logins_avoided} logins avoided")
+        # a cancelled request does not cancel the login the others wait for
+        await asyncio.shield(self._login_task)
+
+    async def _async_login(self) -> None:
+        """Login and release the requests waiting for it."""
+        try:
+            await self.login()
+        finally:
+            self._login_generation += 1
+            self._login_task = None
+
     async def login(self):
         """Login to the API."""
         try:
             response = await self._post(cmd=LOGIN, payload={
-                PARAM_USERNAME: self.username, PARAM_PASSWORD: self.password, PARAM_DISPLAY_NAME: DISPLAY_NAME_VALUE})
+                PARAM_USERNAME: self.username, PARAM_PASSWORD: self.password, PARAM_DISPLAY_NAME: DISPLAY_NAME_VALUE}, allowed_login=False)
             _LOGGER.debug(f"Login response {response}")
+            # the refusals may depend on the session, writes are tried again
+            self._refused_writes.clear()
         except Exception as e:  # pylint: disable=broad-except
             _LOGGER.error("Unexpected error on LOGIN %s", str(e))
             return None
@@ -262,6 +838,7 @@ class AlfenDevice:
 
     async def _update_value(self, api_param, value, allowed_login=True) -> ClientResponse | None:
         """Update a value on the API."""
+        login_generation = self._login_generation
         try:
             self.wait = True
             async with self._session.post(
@@ -272,8 +849,11 @@ class AlfenDevice:
                     ssl=self.ssl) as response:
                 if response.status == 401 and allowed_login:
                     _LOGGER.debug("POST(Update) with login")
-                    await self.login()
+                    await self._login_after_unauthorized(login_generation)
                     return await self._update_value(api_param, value, False)
+                if response.status == 403:
+                    # refused while logged in, skip the writes to it until the next login
+                    self._refused_writes.add(api_param)
                 response.raise_for_status()
                 return response
         except Exception as e:  # pylint: disable=broad-except
@@ -289,43 +869,335 @@ class AlfenDevice:
         _LOGGER.debug(f"Status Response {cmd}: {response}")
 
         if response is not None:
-            if self.properties is None:
-                self.properties = []
-            for resp in response[PROPERTIES]:
-                for prop in self.properties:
-                    if prop[ID] == resp[ID]:
-                        prop[VALUE] = resp[VALUE]
-                        break
+            self._notify_subscribers(self._publish(response[PROPERTIES]))
 
     async def _get_all_properties_value(self):
         """Get all properties from the API."""
         _LOGGER.debug(f"Get properties")
-        properties = []
-        for cat in (CAT_GENERIC, CAT_GENERIC2, CAT_METER1, CAT_STATES, CAT_TEMP, CAT_OCPP, CAT_METER4, CAT_MBUS_TCP, CAT_COMM, CAT_DISPLAY, CAT_METER2):
-            nextRequest = True
-            offset = 0
-            attempt = 0
-            while (nextRequest):
-                attempt += 1
-                cmd = f"{PROP}?{CAT}={cat}&{OFFSET}={offset}"
-                response = await self._get(url=self.__get_url(cmd))
-                _LOGGER.debug(f"Status Response {cmd}: {response}")
-
-                if response is not None:
-                    attempt = 0
-                    properties += response[PROPERTIES]
-                    nextRequest = response[TOTAL] > (
-                        offset + len(response[PROPERTIES]))
-                    offset += len(response[PROPERTIES])
-                elif attempt >= 3:
-                    # This only possible in case of series of timeouts or unknown exceptions in self._get()
-                    # It's better to break completely, otherwise we can provide partial data in self.properties.
-                    _LOGGER.debug(f"Returning earlier after {attempt} attempts")
-                    self.properties = []
-                    return
+        now = time.monotonic()
+        # may outlast a short scan interval on purpose, see MIN_POLL_DEADLINE
+        self._poll_deadline = now + max(self.scan_interval, MIN_POLL_DEADLINE)
+        slow = now >= self._next_slow_poll
+        status_changes = {}
+        if not slow and self.idle and now < self._next_fast_poll:
+            properties = await self._get_status_properties()
+            status_changes = self._publish(properties)
+            if not any(api_param in status_changes for api_param in STATUS_IDS):
+                # only the failed and deferred requests, so they do not wait for the next meter poll
+                properties = await self._get_polled_properties((), ())
+                self.changes = {**status_changes, **self._publish(properties)}
+                return
+            # poll the meters right away once the status changes
+            _LOGGER.debug(f"Charging status changed {status_changes}")
+
+        properties = await self._get_polled_properties(
+            self._get_poll_ids(slow), self._get_poll_categories(slow))
 
         _LOGGER.debug(f"Properties {properties}")
-        self.properties = properties
+        self.changes = {**status_changes, **self._publish(properties)}
+        _LOGGER.debug(f"Changed properties {self.changes}")
+        if slow:
+            self._next_slow_poll = time.monotonic() + self.slow_scan_interval
+        self._update_idle()
+        if self.idle:
+            self._next_fast_poll = time.monotonic() + self.idle_scan_interval
+        if not self._full_poll_done and self._polled_categories.issuperset(CATEGORIES):
+            self._full_poll_done = True
+            self.catalog.set_complete()
+            self._invalidate_poll_plan()
+
+    async def _get_polled_properties(self, poll_ids: Iterable[str], poll_categories: Iterable[str]) -> list[dict]:
+        """Get the id lists or categories of a poll, with the deferred and failed ones."""
+        batches = []
+        if self._fetch_by_ids:
+            # requests left at the last deadline go first, so they do not roll over again
+            batches = sorted(self._deferred_batches)
+            batches += [ids for ids in (*poll_ids, *sorted(self._failed_batches))
+                        if ids not in batches]
+        properties = await self._get_properties_by_ids(batches)
+        if properties is None:
+            categories = {*poll_categories, *self._failed_categories}
+            properties = await self._get_properties_by_category(
+                tuple(cat for cat in CATEGORIES if cat in self._deferred_categories)
+                + tuple(cat for cat in CATEGORIES if cat in categories and cat not in self._deferred_categories))
+        return properties
+
+    def watch_properties(self, api_params: Iterable[str], duration: int, record: bool = False) -> None:
+        """Poll the properties every second for the duration, besides the regular poll.
+
+        An object index without subindex, e.g. 2501, watches all its known subindices.
+        """
+        expiry = time.monotonic() + duration
+        for api_param in api_params:
+            if "_" not in api_param:
+                for prop in self.get_object_properties(int(api_param, 16)):
+                    self._watches[prop.id] = (expiry, record)
+                continue
+            self._watches[api_param] = (expiry, record)
+        _LOGGER.debug(f"Watch properties {self._watches}")
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = self._hass.async_create_background_task(
+                self._async_watch(), f"{DOMAIN} watch {self.name}")
+
+    def stop_watch(self) -> None:
+        """Stop polling the watched properties."""
+        self._watches.clear()
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _async_watch(self) -> None:
+        """Poll the watched properties every second until all watches expired."""
+        next_poll = time.monotonic()
+        while True:
+            now = time.monotonic()
+            self._watches = {
+                api_param: watch for api_param, watch in self._watches.items() if watch[0] > now}
+            if not self._watches:
+                _LOGGER.debug("Watches expired")
+                self._watch_recorded.clear()
+                return
+
+            # after a logout on purpose, a request would take the session back with a login
+            if not self.keepLogout:
+                batches = _batch_ids(sorted(self._watches), self._ids_max_length)
+                responses = await asyncio.gather(*(
+                    self._get_prop(f"{PROP}?{IDS}={ids}", now + WATCH_INTERVAL) for ids in batches),
+                    return_exceptions=True)
+                properties = [prop for response in responses if isinstance(response, dict)
+                              for prop in response.get(PROPERTIES, ())]
+                if properties:
+                    self._notify_subscribers(self._publish(properties).keys())
+                    await self._record_watch(properties)
+
+            # a poll that took longer than the interval is not made up for
+            next_poll = max(next_poll + WATCH_INTERVAL, time.monotonic())
+            await asyncio.sleep(next_poll - time.monotonic())
+
+    async def _record_watch(self, properties: list[dict]) -> None:
+        """Append the changed values of the recorded properties to the watch file."""
+        now = time.time()
+        lines = []
+        for prop in properties:
+            watch = self._watches.get(prop[ID])
+            if watch is None or not watch[1]:
+                continue
+            # only changes are written, the value holds until the next line of the id
+            if prop[ID] in self._watch_recorded and self._watch_recorded[prop[ID]] == prop[VALUE]:
+                continue
+            self._watch_recorded[prop[ID]] = prop[VALUE]
+            lines.append(f"{now:.1f},{prop[ID]},{prop[VALUE]}\n")
+        if lines:
+            path = self._hass.config.path(f"{DOMAIN}_watch_{slugify(self.name)}.csv")
+            await self._hass.async_add_executor_job(_append_lines, path, lines)
+
+    def _update_idle(self) -> None:
+        """Update whether no socket has a charging session in progress."""
+        statuses = [self.get_property_value(api_param) for api_param in STATUS_IDS]
+        statuses = [status for status in statuses if status is not None]
+        idle = bool(statuses) and not any(status in ACTIVE_STATUS_CODES for status in statuses)
+        if idle != self.idle:
+            _LOGGER.debug(f"Idle {idle}, charging status {statuses}")
+        self.idle = idle
+
+    async def _get_status_properties(self) -> list[dict]:
+        """Get the charging status of the sockets."""
+        api_params = [api_param for api_param in STATUS_IDS
+                      if self.catalog.get_category(api_param) is not None]
+        properties = None
+        if self._fetch_by_ids:
+            properties = await self._get_properties_by_ids(_batch_ids(api_params, self._ids_max_length))
+        if properties is None:
+            categories = {self.catalog.get_category(api_param) for api_param in api_params}
+            properties = await self._get_properties_by_category(
+                tuple(cat for cat in CATEGORIES if cat in categories))
+        return properties
+
+    async def _get_prop(self, cmd: str, deadline: float | None = None, json_decode: bool = True) -> dict | str | None:
+        """Get from the API within the limit of concurrent requests and the poll deadline."""
+        if deadline is None:
+            deadline = self._poll_deadline
+        async with self._request_semaphore:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PollDeadlineExceeded(cmd)
+            request_timeout = ClientTimeout(
+                total=min(TIMEOUT, remaining), connect=REQUEST_CONNECT_TIMEOUT, sock_read=REQUEST_READ_TIMEOUT)
+            response = await self._get(
+                url=self.__get_url(cmd), json_decode=json_decode, request_timeout=request_timeout)
+        _LOGGER.debug(f"Status Response {cmd}: {response}")
+        return response
+
+    async def _get_properties_by_ids(self, batches: list[str]) -> list[dict] | None:
+        """Get the properties of the id lists that did not fail, None to fall back to the categories."""
+        if not batches:
+            return None
+        responses = await asyncio.gather(
+            *(self._get_ids_properties(ids) for ids in batches), return_exceptions=True)
+        if any(response == [] for response in responses):
+            _LOGGER.debug(f"No properties for {batches}, polling by category")
+            self._fetch_by_ids = False
+            self._failed_batches.clear()
+            self._deferred_batches.clear()
+            self._invalidate_poll_plan()
+            return None
+
+        properties = []
+        for ids, response in zip(batches, responses):
+            if isinstance(response, PollDeadlineExceeded):
+                self._deferred_batches.add(ids)
+                continue
+            if isinstance(response, BaseException):
+                raise response
+            self._deferred_batches.discard(ids)
+            if response is None:
+                self._failed_batches.add(ids)
+                self._failed_ids.update(ids.split(","))
+            else:
+                self._failed_batches.discard(ids)
+                properties += response
+        if self._deferred_batches:
+            _LOGGER.debug(f"Deadline passed, request {self._deferred_batches} on the next poll")
+        return properties
+
+    async def _get_ids_properties(self, ids: str) -> list[dict] | None:
+        """Get the properties of a comma separated id list, None if a request keeps failing."""
+        first = await self._get_ids_page(ids, 0)
+        if first is None:
+            return None
+        properties = first.get(PROPERTIES) or []
+
+        # the answer is paged like a category, follow the total for the ids after the first page
+        total = first.get(TOTAL, len(properties))
+        while properties and len(properties) < total:
+            page = await self._get_ids_page(ids, len(properties))
+            if page is None:
+                return None
+            if not page.get(PROPERTIES):
+                break
+            properties += page[PROPERTIES]
+        return properties
+
+    async def _get_ids_page(self, ids: str, offset: int) -> dict | None:
+        """Get a page of the properties of a comma separated id list, None if the request keeps failing."""
+        cmd = f"{PROP}?{IDS}={ids}"
+        if offset:
+            cmd += f"&{OFFSET}={offset}"
+        attempt = 0
+        response = None
+        while response is None and attempt < 3:
+            attempt += 1
+            response = await self._get_prop(cmd)
+
+        if response is None:
+            _LOGGER.debug(f"Returning earlier after {attempt} attempts")
+        return response
+
+    async def _get_properties_by_category(self, categories: tuple[str, ...]) -> list[dict]:
+        """Get the properties of the categories that did not fail."""
+        # the pages of the first categories go before the first page of the last
+        # ones, so the categories complete in order when the deadline passes
+        category_semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async def get_category_properties(cat: str) -> list[dict] | None:
+            async with category_semaphore:
+                return await self._get_category_properties(cat)
+
+        responses = await asyncio.gather(
+            *(get_category_properties(cat) for cat in categories), return_exceptions=True)
+        properties = []
+        for cat, response in zip(categories, responses):
+            if isinstance(response, PollDeadlineExceeded):
+                self._deferred_categories.add(cat)
+                continue
+            if isinstance(response, BaseException):
+                raise response
+            self._deferred_categories.discard(cat)
+            if response is None:
+                self._failed_categories.add(cat)
+                self._failed_ids.update(self.catalog.get_category_ids(cat))
+            else:
+                self._failed_categories.discard(cat)
+                self._polled_categories.add(cat)
+                properties += response
+        if self._failed_categories:
+            _LOGGER.debug(f"Retry categories {self._failed_categories} on the next poll")
+        if self._deferred_categories:
+            _LOGGER.debug(f"Deadline passed, request categories {self._deferred_categories} on the next poll")
+        return properties
+
+    async def _get_category_properties(self, cat: str) -> list[dict] | None:
+        """Get the properties of a category, None if a request keeps failing."""
+        first = await self._get_category_page(cat, 0)
+        if first is None:
+            return None
+        properties = first[PROPERTIES]
+        total = first[TOTAL]
+        page_size = len(properties)
+
+        # the first page tells the offsets of the other pages, request them together
+        if page_size:
+            pages = await asyncio.gather(*(
+                self._get_category_page(cat, offset) for offset in range(page_size, total, page_size)),
+                return_exceptions=True)
+            for page in pages:
+                if isinstance(page, BaseException):
+                    raise page
+            if any(page is None for page in pages):
+                return None
+            for page in pages:
+                properties += page[PROPERTIES]
+                if len(page[PROPERTIES]) < page_size:
+                    break
+
+        # a page shorter than the first one leaves a gap, get the rest page by page
+        while len(properties) < total:
+            page = await self._get_category_page(cat, len(properties))
+            if page is None:
+                return None
+            if not page[PROPERTIES]:
+                break
+            properties += page[PROPERTIES]
+        return properties
+
+    async def _get_category_page(self, cat: str, offset: int) -> dict | None:
+        """Get a page of the properties of a category, None if the request keeps failing."""
+        attempt = 0
+        response = None
+        while response is None and attempt < 3:
+            attempt += 1
+            response = await self._get_prop(f"{PROP}?{CAT}={cat}&{OFFSET}={offset}")
+
+        if response is None:
+            # This only possible in case of series of timeouts or unknown exceptions in self._get()
+            # The whole category is dropped, otherwise we can provide partial data in self.properties.
+            _LOGGER.debug(f"Returning earlier after {attempt} attempts")
+        return response
+
+    def _publish(self, properties: list[dict]) -> dict[str, tuple]:
+        """Build the next snapshot from an API response, swap it in and return the changes."""
+        # the next snapshot is built without awaiting in between, so readers
+        # never see a partially applied response
+        now = time.monotonic()
+        next_properties = dict(self.snapshot.properties)
+        # received by another request, so no longer stale because of a failed one
+        self._failed_ids.difference_update(resp[ID] for resp in properties)
+        self.catalog.update(properties)
+        changes = _merge_properties(next_properties, properties, now, self.catalog)
+        # always derived, so the virtual properties are as fresh as their sources
+        try:
+            changes.update(_merge_properties(
+                next_properties, _smart_meter_power(next_properties), now, self.catalog))
+        except Exception as e:  # pylint: disable=broad-except
+            # keep the response, only the virtual properties are not updated
+            _LOGGER.error(f"Unable to derive the smart meter power: {e}")
+        keys, ids = self.snapshot.keys, self.snapshot.ids
+        # properties are never removed, the index only changes when new ids arrive
+        if len(next_properties) != len(self.snapshot.properties):
+            keys, ids = _index_properties(next_properties)
+        self.snapshot = AlfenSnapshot(
+            self.snapshot.generation + 1, MappingProxyType(next_properties), keys, ids)
+        return changes
 
     async def reboot_wallbox(self):
         """Reboot the wallbox."""
@@ -338,7 +1210,8 @@ class AlfenDevice:
         transactionLoop = True
         counter = 0
         while transactionLoop:
-            response = await self._get(url=self.__get_url("transactions?offset="+ str(offset)), json_decode=False)
+            # bound by the poll deadline, raises PollDeadlineExceeded once it passed
+            response = await self._get_prop("transactions?offset="+ str(offset), json_decode=False)
             #_LOGGER.debug(response)
             # split this text into lines with \n
             lines = str(response).splitlines()
@@ -370,11 +1243,10 @@ class AlfenDevice:
                         # 10: y
 
 
-                        if self.latest_tag is None:
-                            self.latest_tag = {}
-                        self.latest_tag[socket,"start", "tag"] = tag
-                        self.latest_tag[socket,"start","date"] = date
-                        self.latest_tag[socket,"start","kWh"] = kWh
+                        transaction = self._get_socket_transaction(socket)
+                        transaction.start_tag = tag
+                        transaction.start_date = _parse_transaction_date(date)
+                        transaction.start_kwh = _parse_transaction_kwh(kWh)
 
                     elif "txstop" in line:
                         #_LOGGER.debug("stop line: " + line)
@@ -389,18 +1261,16 @@ class AlfenDevice:
                         # 2: transaction id
                         # 9: y
 
-                        if self.latest_tag is None:
-                            self.latest_tag = {}
-                        self.latest_tag[socket,"stop","tag"] = tag
-                        self.latest_tag[socket,"stop","date"] = date
-                        self.latest_tag[socket,"stop","kWh"] = kWh
+                        transaction = self._get_socket_transaction(socket)
+                        transaction.stop_tag = tag
+                        transaction.stop_date = _parse_transaction_date(date)
+                        transaction.stop_kwh = _parse_transaction_kwh(kWh)
 
                         # store the latest start kwh and date
-                        for key in list(self.latest_tag):
-                            if key[0] == socket and key[1] ==  "start" and key[2] == "kWh":
-                                self.latest_tag[socket,"last_start","kWh"] = self.latest_tag[socket,"start","kWh"]
-                            if key[0] == socket and key[1] ==  "start" and key[2] == "date":
-                                self.latest_tag[socket,"last_start","date"] = self.latest_tag[socket,"start","date"]
+                        if transaction.start_kwh is not None:
+                            transaction.last_start_kwh = transaction.start_kwh
+                        if transaction.start_date is not None:
+                            transaction.last_start_date = transaction.start_date
 
                     elif "mv" in line:
                         #_LOGGER.debug("mv line: " + line)
@@ -409,12 +1279,11 @@ class AlfenDevice:
                         date = splitline[3] + " " + splitline[4]
                         kWh = splitline[5]
 
-                        if self.latest_tag is None:
-                            self.latest_tag = {}
-                        self.latest_tag[socket,"mv","date"] = date
-                        self.latest_tag[socket,"mv","kWh"] = kWh
+                        transaction = self._get_socket_transaction(socket)
+                        transaction.mv_date = _parse_transaction_date(date)
+                        transaction.mv_kwh = _parse_transaction_kwh(kWh)
 
-                        #_LOGGER.debug(self.latest_tag)
+                        #_LOGGER.debug(self.transactions)
 
                     elif 'dto' in line:
                         continue
@@ -437,7 +1306,7 @@ class AlfenDevice:
                         counter = 0
 
                     if counter == 2:
-                        _LOGGER.debug(self.latest_tag)
+                        _LOGGER.debug(self.transactions)
                         transactionLoop = False
                         break
                 except ValueError:
@@ -449,6 +1318,13 @@ class AlfenDevice:
 
 
 
+    def _get_socket_transaction(self, socket: str) -> AlfenTransaction:
+        """Get the transaction state of a socket, creating it if needed."""
+        transaction = self.transactions.get(socket)
+        if transaction is None:
+            transaction = self.transactions[socket] = AlfenTransaction()
+        return transaction
+
     async def async_request(self, method: str, cmd: str, json_data=None) -> ClientResponse | None:
         """Send a request to the API."""
         try:
@@ -469,15 +1345,15 @@ class AlfenDevice:
 
     async def set_value(self, api_param, value):
         """Set a value on the API."""
+        if api_param in self._refused_writes:
+            _LOGGER.warning(f"Property {api_param} was refused since the last login, value {value} is not set")
+            return
         response = await self._update_value(api_param, value)
         if response:
             # we expect that the value is updated so we are just update the value in the properties
-            for index, prop in enumerate(self.properties):
-                if prop[ID] == api_param:
-                    _LOGGER.debug(f"Set {api_param} value {value}")
-                    prop[VALUE] = value
-                    self.properties[index] = prop
-                    break
+            if self.get_property(api_param) is not None:
+                _LOGGER.debug(f"Set {api_param} value {value}")
+                self._notify_subscribers(self._publish([{ID: api_param, VALUE: value}]))
 
     async def get_value(self, api_param):
         """Get a value from the API."""
@@ -14,7 +14,6 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
 from .const import (
-    ID,
     LICENSE_HIGH_POWER,
     LICENSE_LOAD_BALANCING_ACTIVE,
     LICENSE_LOAD_BALANCING_STATIC,
@@ -24,7 +23,6 @@ from .const import (
     LICENSE_PERSONALIZED_DISPLAY,
     LICENSE_RFID,
     LICENSE_SCN,
-    VALUE,
 )
 from .entity import AlfenEntity
 
@@ -134,9 +132,8 @@ class AlfenBinarySensor(AlfenEntity, BinarySensorEntity):
         # custom code for license
         if self.entity_description.api_param is None:
             # check if license is available
-            if '21A2_0' in self._device.properties:
-                if self._device.properties['21A2_0'][VALUE] == LICENSE_NONE:
-                    return
+            if self._device.get_property_value('21A2_0') == LICENSE_NONE:
+                return
             _LOGGER.debug(self._device.licenses)
             if self.entity_description.key == "license_scn":
                 self._attr_is_on = LICENSE_SCN in self._device.licenses
@@ -164,10 +161,7 @@ class AlfenBinarySensor(AlfenEntity, BinarySensorEntity):
         """Return True if entity is available."""
 
         if self.entity_description.api_param is not None:
-            for prop in self._device.properties:
-                if prop[ID] == self.entity_description.api_param:
-                    return True
-            return False
+            return self._device.is_property_available(self.entity_description.api_param)
         else:
             return True
 
@@ -176,9 +170,6 @@ class AlfenBinarySensor(AlfenEntity, BinarySensorEntity):
         """Return True if entity is on."""
 
         if self.entity_description.api_param is not None:
-            for prop in self._device.properties:
-                if prop[ID] == self.entity_description.api_param:
-                    return prop[VALUE] == 1
-            return False
+            return self._device.get_property_value(self.entity_description.api_param) == 1
         else:
             return self._attr_is_on
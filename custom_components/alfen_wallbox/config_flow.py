@@ -14,9 +14,21 @@ from homeassistant.const import (
     CONF_SCAN_INTERVAL,
     CONF_USERNAME,
 )
+from homeassistant.core import callback
 
 from .alfen import AlfenDevice
-from .const import DOMAIN, TIMEOUT
+from .const import (
+    CONF_IDLE_SCAN_INTERVAL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STALE_TIMEOUT,
+    DEFAULT_IDLE_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_STALE_TIMEOUT,
+    DOMAIN,
+    TIMEOUT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,27 +40,34 @@ class FlowHandler(config_entries.ConfigFlow):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
-    async def _create_entry(self, host:str, name:str, username:str, password:str, scan_interval:int) -> None:
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+    async def _create_entry(self, host:str, name:str, username:str, password:str, scan_interval:int, stale_timeout:int) -> None:
         """Register new entry."""
         # Check if ip already is registered
         for entry in self._async_current_entries():
             if entry.data[CONF_HOST] == host:
                 return self.async_abort(reason="already_configured")
 
-        return self.async_create_entry(title=host, data={CONF_HOST: host, CONF_NAME: name, CONF_USERNAME: username, CONF_PASSWORD: password, CONF_SCAN_INTERVAL: scan_interval})
+        return self.async_create_entry(title=host, data={CONF_HOST: host, CONF_NAME: name, CONF_USERNAME: username, CONF_PASSWORD: password, CONF_SCAN_INTERVAL: scan_interval, CONF_STALE_TIMEOUT: stale_timeout})
 
-    async def _create_device(self, host:str, name:str, username:str, password:str, scan_interval:int):
+    async def _create_device(self, host:str, name:str, username:str, password:str, scan_interval:int, stale_timeout:int = DEFAULT_STALE_TIMEOUT):
         """Create device."""
 
+        device = AlfenDevice(
+            self.hass,
+            host,
+            name,
+            username,
+            password,
+            scan_interval,
+            stale_timeout
+        )
         try:
-            device = AlfenDevice(
-                self.hass,
-                host,
-                name,
-                username,
-                password,
-                scan_interval
-            )
             with timeout(TIMEOUT):
                 await device.init()
         except asyncio.TimeoutError:
@@ -59,22 +78,32 @@ class FlowHandler(config_entries.ConfigFlow):
         except Exception:  # pylint: disable=broad-except
             _LOGGER.exception("Unexpected error creating device")
             return self.async_abort(reason="device_fail")
+        finally:
+            # the device only checks the connection, the entry creates its own
+            await device.async_close()
 
-        return await self._create_entry(host, name, username, password, scan_interval)
+        return await self._create_entry(host, name, username, password, scan_interval, stale_timeout)
 
     async def async_step_user(self, user_input=None):
         """User initiated config flow."""
-        if user_input is None:
+        errors = {}
+        if user_input is not None and user_input[CONF_STALE_TIMEOUT] <= user_input[CONF_SCAN_INTERVAL]:
+            errors[CONF_STALE_TIMEOUT] = "stale_timeout_too_short"
+        if user_input is None or errors:
+            data_schema = vol.Schema({
+                vol.Required(CONF_HOST): str,
+                vol.Required(CONF_USERNAME, default="admin"): str,
+                vol.Required(CONF_PASSWORD): str,
+                vol.Required(CONF_NAME): str,
+                vol.Required(CONF_SCAN_INTERVAL, default=5): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_STALE_TIMEOUT, default=DEFAULT_STALE_TIMEOUT): vol.All(int, vol.Range(min=2))
+            })
             return self.async_show_form(
-                step_id="user", data_schema=vol.Schema({
-                    vol.Required(CONF_HOST): str,
-                    vol.Required(CONF_USERNAME, default="admin"): str,
-                    vol.Required(CONF_PASSWORD): str,
-                    vol.Required(CONF_NAME): str,
-                    vol.Required(CONF_SCAN_INTERVAL, default=5): int
-                })
+                step_id="user",
+                data_schema=self.add_suggested_values_to_schema(data_schema, user_input),
+                errors=errors
             )
-        return await self._create_device(user_input[CONF_HOST], user_input[CONF_NAME], user_input[CONF_USERNAME], user_input[CONF_PASSWORD], user_input[CONF_SCAN_INTERVAL])
+        return await self._create_device(user_input[CONF_HOST], user_input[CONF_NAME], user_input[CONF_USERNAME], user_input[CONF_PASSWORD], user_input[CONF_SCAN_INTERVAL], user_input[CONF_STALE_TIMEOUT])
 
     async def async_step_import(self, user_input):
         """Import a config entry."""
@@ -82,3 +111,33 @@ class FlowHandler(config_entries.ConfigFlow):
         if not host:
             return await self.async_step_user()
         return await self._create_device(host, user_input[CONF_NAME], user_input[CONF_USERNAME], user_input[CONF_PASSWORD])
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the polling options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the polling intervals."""
+        errors = {}
+        if user_input is not None:
+            # values are only stale once they missed at least one poll
+            if user_input[CONF_STALE_TIMEOUT] <= user_input[CONF_SCAN_INTERVAL]:
+                errors[CONF_STALE_TIMEOUT] = "stale_timeout_too_short"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        conf = {**self.config_entry.data, **self.config_entry.options, **(user_input or {})}
+        return self.async_show_form(
+            step_id="init", data_schema=vol.Schema({
+                vol.Required(CONF_SCAN_INTERVAL, default=conf.get(CONF_SCAN_INTERVAL, 5)): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_IDLE_SCAN_INTERVAL, default=conf.get(CONF_IDLE_SCAN_INTERVAL, DEFAULT_IDLE_SCAN_INTERVAL)): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_SLOW_SCAN_INTERVAL, default=conf.get(CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL)): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_STALE_TIMEOUT, default=conf.get(CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT)): vol.All(int, vol.Range(min=2)),
+                vol.Required(CONF_MAX_CONCURRENT_REQUESTS, default=conf.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)): vol.All(int, vol.Range(min=1))
+            }),
+            errors=errors
+        )
@@ -6,7 +6,56 @@ VALUE = "value"
 PROPERTIES = "properties"
 CAT = "cat"
 OFFSET = "offset"
+IDS = "ids"
 TOTAL = "total"
+TYPE = "type"
+LEN = "len"
+
+# property type codes of the API, used to normalize the values at ingest
+TYPE_FLOAT = frozenset({8})
+TYPE_INT = frozenset({7, 27})
+
+# max length of the URL of one prop?ids= request, including the host and the offset
+IDS_MAX_URL_LENGTH = 512
+# max ids of one prop?ids= request, the size of a page of a category
+IDS_MAX_COUNT = 32
+
+CATALOG_STORAGE_VERSION = 2
+# seconds to wait before the updated catalog is written to disk
+CATALOG_SAVE_DELAY = 30
+
+# pseudo property id notified when the transactions are updated
+PROP_TRANSACTION = "transaction"
+
+# virtual properties with the smart meter power, derived once per poll
+PROP_SMART_METER_L1 = "smart_meter_l1"
+PROP_SMART_METER_L2 = "smart_meter_l2"
+PROP_SMART_METER_L3 = "smart_meter_l3"
+PROP_SMART_METER_TOTAL = "smart_meter_total"
+
+# smart meter phase power -> (voltage, current) property ids
+SMART_METER_PHASES = {
+    PROP_SMART_METER_L1: ("5221_3", "212F_1"),
+    PROP_SMART_METER_L2: ("5221_4", "212F_2"),
+    PROP_SMART_METER_L3: ("5221_5", "212F_3"),
+}
+
+# number of sockets and licenses, fetched at startup to decide the entities
+STARTUP_IDS = ("205E_0", "21A2_0")
+
+# charging status of socket 1 and 2, polled every scan interval
+STATUS_IDS = ("2501_2", "2502_2")
+# charging status codes of a session in progress, polled at the scan interval;
+# any other status is idle and polled at the idle scan interval
+ACTIVE_STATUS_CODES = frozenset({
+    5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 35, 36, 38, 39, 40, 41, 42, 43})
+
+# virtual property -> property ids of the API it is derived from
+VIRTUAL_PROPERTY_SOURCES = {
+    **SMART_METER_PHASES,
+    PROP_SMART_METER_TOTAL: tuple(
+        api_param for phase in SMART_METER_PHASES.values() for api_param in phase),
+}
 
 METHOD_POST = "POST"
 METHOD_GET = "GET"
@@ -38,10 +87,59 @@ CAT_DISPLAY = "display"
 # CAT_ACCELERO = "accelero"
 CAT_METER2 = "meter2"
 
+CATEGORIES = (
+    CAT_GENERIC,
+    CAT_GENERIC2,
+    CAT_METER1,
+    CAT_STATES,
+    CAT_TEMP,
+    CAT_OCPP,
+    CAT_METER4,
+    CAT_MBUS_TCP,
+    CAT_COMM,
+    CAT_DISPLAY,
+    CAT_METER2,
+)
+# categories with meter and state values, polled every scan interval; the
+# configuration in the other categories is polled every slow scan interval
+FAST_CATEGORIES = (
+    CAT_METER1,
+    CAT_STATES,
+    CAT_TEMP,
+    CAT_METER4,
+    CAT_METER2,
+)
+
 COMMAND_REBOOT = "reboot"
 
 INTERVAL = 5
 TIMEOUT = 20
+# connections kept open to a wallbox, its web server handles few at a time
+MAX_CONNECTIONS = 2
+# seconds a resolved host name is cached
+DNS_CACHE_TTL = 300
+# seconds to connect and to wait for data of a single request
+REQUEST_CONNECT_TIMEOUT = 5
+REQUEST_READ_TIMEOUT = 10
+# minimum seconds a poll may take, otherwise the scan interval; requests
+# left at the deadline are made first on the next poll. Longer than the
+# default scan interval of 5 seconds on purpose: a shorter budget would time
+# out requests a busy wallbox answers in a few seconds, and the poll loop
+# skips the ticks a poll overruns
+MIN_POLL_DEADLINE = 10
+
+CONF_STALE_TIMEOUT = "stale_timeout"
+# seconds after which a property that is not updated becomes unavailable
+DEFAULT_STALE_TIMEOUT = 120
+CONF_SLOW_SCAN_INTERVAL = "slow_scan_interval"
+# seconds between the polls of the configuration categories
+DEFAULT_SLOW_SCAN_INTERVAL = 300
+CONF_IDLE_SCAN_INTERVAL = "idle_scan_interval"
+# seconds between the polls of the meter and state categories while idle
+DEFAULT_IDLE_SCAN_INTERVAL = 60
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+# property requests in flight to the wallbox at the same time
+DEFAULT_MAX_CONCURRENT_REQUESTS = 2
 
 SERVICE_REBOOT_WALLBOX = "reboot_wallbox"
 SERVICE_SET_CURRENT_LIMIT = "set_current_limit"
@@ -52,6 +150,13 @@ SERVICE_ENABLE_PHASE_SWITCHING = "enable_phase_switching"
 SERVICE_DISABLE_PHASE_SWITCHING = "disable_phase_switching"
 SERVICE_SET_GREEN_SHARE = "set_green_share"
 SERVICE_SET_COMFORT_POWER = "set_comfort_power"
+SERVICE_WATCH_PROPERTIES = "watch_properties"
+
+# seconds between the polls of the watched properties
+WATCH_INTERVAL = 1
+# seconds a property is watched unless the service call says otherwise
+DEFAULT_WATCH_DURATION = 300
+MAX_WATCH_DURATION = 3600
 
 ALFEN_PRODUCT_MAP = {
     "NG900-60503": "Eve Single S-line, 1 phase, LED, type 2 socket",
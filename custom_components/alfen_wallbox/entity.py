@@ -1,6 +1,7 @@
 """Base entity for Alfen Wallbox integration."""
 import logging
 
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo, Entity
 
 from .alfen import AlfenDevice
@@ -12,6 +13,8 @@ _LOGGER = logging.getLogger(__name__)
 class AlfenEntity(Entity):
     """Define a base Alfen entity."""
 
+    _attr_should_poll = False
+
     def __init__(self, device: AlfenDevice) -> None:
         """Initialize the Alfen entity."""
         self._device = device
@@ -24,6 +27,32 @@ class AlfenEntity(Entity):
             sw_version=self._device.info.firmware_version,
         )
 
+    @property
+    def api_params(self) -> tuple[str, ...]:
+        """Return the property ids this entity depends on."""
+        api_param = getattr(self.entity_description, "api_param", None)
+        if api_param is None:
+            return ()
+        return (api_param,)
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return not any(self._device.is_stale(api_param) for api_param in self.api_params)
+
     async def async_added_to_hass(self) -> None:
         """Add listener for state changes."""
         await super().async_added_to_hass()
+        self.async_on_remove(
+            self._device.async_subscribe(self.api_params, self._handle_device_update)
+        )
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Handle a change of one of the subscribed properties."""
+        self._async_update_attrs()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Update the entity attributes."""
@@ -19,14 +19,13 @@ from homeassistant.const import (
     UnitOfPower,
     UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
 from .const import (
-    ID,
     LICENSE_HIGH_POWER,
     SERVICE_SET_COMFORT_POWER,
     SERVICE_SET_CURRENT_LIMIT,
@@ -502,7 +501,6 @@ class AlfenNumber(AlfenEntity, NumberEntity):
 
     _attr_has_entity_name = True
     _attr_name = None
-    _attr_should_poll = False
     entity_description: AlfenNumberDescription
 
     def __init__(
@@ -560,25 +558,30 @@ class AlfenNumber(AlfenEntity, NumberEntity):
 
     def _get_current_option(self) -> str | None:
         """Return the current option."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                _LOGGER.debug("%s Value: %s",
-                              self.entity_description.name, prop[VALUE])
-
-                if self.entity_description.round_digits is not None:
-                    return round(prop[VALUE], self.entity_description.round_digits)
-
-                # change comfort level depends on max allowed phase
-                if self.entity_description.key == "lb_solar_charging_comfort_level":
-                    if self._device.max_allowed_phases == 3:
-                        self._attr_max_value = self.entity_description.native_max_value
-                        self._attr_native_max_value = self.entity_description.native_max_value
-                    else:
-                        self._attr_max_value = 3300
-                        self._attr_native_max_value = 3300
-
-                return prop[VALUE]
-        return None
+        value = self._device.get_property_value(self.entity_description.api_param)
+        if value is None:
+            return None
+        _LOGGER.debug("%s Value: %s",
+                      self.entity_description.name, value)
+
+        if self.entity_description.round_digits is not None:
+            return round(value, self.entity_description.round_digits)
+
+        # change comfort level depends on max allowed phase
+        if self.entity_description.key == "lb_solar_charging_comfort_level":
+            if self._device.max_allowed_phases == 3:
+                self._attr_max_value = self.entity_description.native_max_value
+                self._attr_native_max_value = self.entity_description.native_max_value
+            else:
+                self._attr_max_value = 3300
+                self._attr_native_max_value = 3300
+
+        return value
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Update number attributes."""
+        self._attr_native_value = self._get_current_option()
 
     def _set_current_option(self):
         """Set the current option."""
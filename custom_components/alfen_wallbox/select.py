@@ -14,11 +14,9 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
 from .const import (
-    ID,
     SERVICE_DISABLE_RFID_AUTHORIZATION_MODE,
     SERVICE_ENABLE_RFID_AUTHORIZATION_MODE,
     SERVICE_SET_CURRENT_PHASE,
-    VALUE,
 )
 from .entity import AlfenEntity
 
@@ -380,12 +378,10 @@ class AlfenSelect(AlfenEntity, SelectEntity):
 
     def _get_current_option(self) -> str | None:
         """Return the current option."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                if self.entity_description.key == "ps_installation_max_allowed_phase":
-                    self._device.max_allowed_phases = prop[VALUE]
-                return prop[VALUE]
-        return None
+        value = self._device.get_property_value(self.entity_description.api_param)
+        if value is not None and self.entity_description.key == "ps_installation_max_allowed_phase":
+            self._device.max_allowed_phases = value
+        return value
 
     async def async_update(self):
         """Update the entity."""
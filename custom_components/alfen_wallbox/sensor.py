@@ -1,9 +1,13 @@
 """Support for Alfen Eve Single Proline Wallbox."""
+from collections.abc import Callable
 from dataclasses import dataclass
 import datetime
 from datetime import timedelta
+from functools import partial
 import logging
-from typing import Final
+from typing import Any, Final
+
+import voluptuous as vol
 
 from homeassistant import const
 from homeassistant.components.sensor import (
@@ -24,14 +28,25 @@ from homeassistant.const import (
     UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers import entity_platform
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
-from .const import ID, INTERVAL, SERVICE_REBOOT_WALLBOX, VALUE
+from .const import (
+    DEFAULT_WATCH_DURATION,
+    INTERVAL,
+    MAX_WATCH_DURATION,
+    PROP_SMART_METER_L1,
+    PROP_SMART_METER_L2,
+    PROP_SMART_METER_L3,
+    PROP_SMART_METER_TOTAL,
+    PROP_TRANSACTION,
+    SERVICE_REBOOT_WALLBOX,
+    SERVICE_WATCH_PROPERTIES,
+)
 from .entity import AlfenEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -949,7 +964,7 @@ ALFEN_SENSOR_TYPES: Final[tuple[AlfenSensorDescription, ...]] = (
         key="smart_meter_l1",
         name="Smart Meter Power L1",
         icon="mdi:transmission-tower",
-        api_param=None,
+        api_param=PROP_SMART_METER_L1,
         unit=UnitOfPower.WATT,
         round_digits=2,
         state_class=SensorStateClass.MEASUREMENT,
@@ -959,7 +974,7 @@ ALFEN_SENSOR_TYPES: Final[tuple[AlfenSensorDescription, ...]] = (
         key="smart_meter_l2",
         name="Smart Meter Power L2",
         icon="mdi:transmission-tower",
-        api_param=None,
+        api_param=PROP_SMART_METER_L2,
         unit=UnitOfPower.WATT,
         round_digits=2,
         state_class=SensorStateClass.MEASUREMENT,
@@ -969,7 +984,7 @@ ALFEN_SENSOR_TYPES: Final[tuple[AlfenSensorDescription, ...]] = (
         key="smart_meter_l3",
         name="Smart Meter Power L3",
         icon="mdi:transmission-tower",
-        api_param=None,
+        api_param=PROP_SMART_METER_L3,
         unit=UnitOfPower.WATT,
         round_digits=2,
         state_class=SensorStateClass.MEASUREMENT,
@@ -979,7 +994,7 @@ ALFEN_SENSOR_TYPES: Final[tuple[AlfenSensorDescription, ...]] = (
         key="smart_meter_total",
         name="Smart Meter Power Total",
         icon="mdi:transmission-tower",
-        api_param=None,
+        api_param=PROP_SMART_METER_TOTAL,
         unit=UnitOfPower.WATT,
         round_digits=2,
         state_class=SensorStateClass.MEASUREMENT,
@@ -1504,6 +1519,131 @@ ALFEN_SENSOR_DUAL_SOCKET_TYPES: Final[tuple[AlfenSensorDescription, ...]] = (
 )
 
 
+def _decode_raw(value: Any) -> StateType:
+    """Return the value as is."""
+    return value
+
+
+def _decode_dict(value: Any, values_dict: dict[int, str]) -> StateType:
+    """Map the value to its description."""
+    return values_dict.get(value, 'Unknown')
+
+
+def _decode_display_state(value: Any) -> StateType:
+    """Decode the display state status."""
+    if value == 28:
+        return "See error Number"
+    return STATUS_DICT.get(value, 'Unknown')
+
+
+def _decode_display_error(value: Any) -> StateType:
+    """Decode the wallbox display message."""
+    return str(value) + ': ' + DISPLAY_ERROR_DICT.get(value, 'Unknown')
+
+
+def _decode_meter_reading(value: Any) -> StateType:
+    """Convert the meter reading from Wh to kWh."""
+    return round((value / 1000), 2)
+
+
+def _decode_pwm_duty_cycle(value: Any, round_digits: int | None) -> StateType:
+    """Convert the car PWM duty cycle to %."""
+    return round((value / 100), round_digits)
+
+
+def _decode_uptime(value: Any) -> StateType:
+    """Change milliseconds to HH:MM:SS."""
+    return str(datetime.timedelta(milliseconds=value)).split('.', maxsplit=1)[0]
+
+
+def _decode_uptime_hours(value: Any) -> StateType:
+    """Change milliseconds to hours."""
+    result = 0
+    value = str(datetime.timedelta(milliseconds=value))
+    days = value.split(' day')
+    if len(days) > 1:
+        result = int(days[0]) * 24
+        hours = days[1].split(", ")[1].split(
+            ':', maxsplit=1)[0]
+    else:
+        hours = value.split(':', maxsplit=1)[0]
+    result += int(hours)
+    return result
+
+
+def _decode_datetime(value: Any) -> StateType:
+    """Change milliseconds to d/m/y HH:MM:SS."""
+    return datetime.datetime.fromtimestamp(value / 1000).strftime("%d/%m/%Y %H:%M:%S")
+
+
+# decoders of the api params that are checked after the rounding
+API_PARAM_DECODERS: Final[dict[str, Callable[[Any], StateType]]] = {
+    # mode3_state
+    "2501_4": partial(_decode_dict, values_dict=MODE_3_STAT_DICT),
+    "2502_4": partial(_decode_dict, values_dict=MODE_3_STAT_DICT),
+    # Socket CPRO State
+    "2501_3": partial(_decode_dict, values_dict=POWER_STATES_DICT),
+    "2502_3": partial(_decode_dict, values_dict=POWER_STATES_DICT),
+    # Main CSM State
+    "2501_1": partial(_decode_dict, values_dict=MAIN_STATE_DICT),
+    "2502_1": partial(_decode_dict, values_dict=MAIN_STATE_DICT),
+    # OCPP Boot notification
+    "3600_1": partial(_decode_dict, values_dict=OCPP_BOOT_NOTIFICATION_STATUS_DICT),
+    # Modbus TCP/IP connection state
+    "2540_0": partial(_decode_dict, values_dict=MODBUS_CONNECTION_STATES_DICT),
+    # wallbox display message
+    "3190_2": _decode_display_error,
+    "3191_2": _decode_display_error,
+    # Status code
+    "2501_2": partial(_decode_dict, values_dict=STATUS_DICT),
+    "2502_2": partial(_decode_dict, values_dict=STATUS_DICT),
+}
+
+
+def _get_decoder(description: AlfenSensorDescription) -> Callable[[Any], StateType]:
+    """Return the decoder of the value of a sensor."""
+    api_param = description.api_param
+
+    # Display state status
+    if api_param in ("3190_1", "3191_1"):
+        return _decode_display_state
+
+    # meter_reading from w to kWh
+    if api_param in ("2221_22", "3221_22"):
+        return _decode_meter_reading
+
+    # Car PWM Duty cycle %
+    if api_param == "2511_3":
+        return partial(_decode_pwm_duty_cycle, round_digits=description.round_digits)
+
+    if description.key == "uptime":
+        return _decode_uptime
+
+    if description.key == "uptime_hours":
+        return _decode_uptime_hours
+
+    if api_param in ("2187_0", "2059_0"):
+        return _decode_datetime
+
+    # Allowed phase 1 or Allowed Phase 2
+    if api_param in ("312E_0", "312F_0"):
+        return partial(_decode_dict, values_dict=ALLOWED_PHASE_DICT)
+
+    if description.round_digits is not None:
+        return partial(round, ndigits=description.round_digits)
+
+    return API_PARAM_DECODERS.get(api_param, _decode_raw)
+
+
+# sensor key -> decoder, bound once for every sensor backed by an api param
+SENSOR_DECODERS: Final[dict[str, Callable[[Any], StateType]]] = {
+    description.key: _get_decoder(description)
+    for description in ALFEN_SENSOR_TYPES + ALFEN_SENSOR_DUAL_SOCKET_TYPES
+    if description.api_param is not None
+}
+
+
+
 async def async_setup_platform(
         hass: HomeAssistant,
         config: ConfigEntry,
@@ -1542,6 +1682,17 @@ async def async_setup_entry(
         "async_reboot_wallbox",
     )
 
+    platform.async_register_entity_service(
+        SERVICE_WATCH_PROPERTIES,
+        {
+            vol.Required("ids"): vol.All(cv.ensure_list_csv, [cv.matches_regex(r"^[0-9A-Fa-f]{4}(_[0-9A-Fa-f]+)?$")]),
+            vol.Optional("duration", default=DEFAULT_WATCH_DURATION): vol.All(
+                cv.positive_int, vol.Range(min=1, max=MAX_WATCH_DURATION)),
+            vol.Optional("record", default=False): cv.boolean,
+        },
+        "async_watch_properties",
+    )
+
 
 class AlfenMainSensor(AlfenEntity):
     """Representation of a Alfen Main Sensor."""
@@ -1570,17 +1721,17 @@ class AlfenMainSensor(AlfenEntity):
     @property
     def state(self):
         """Return the state of the sensor."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                # exception
-                # status only from socket 1
-                if (prop[ID] == "2501_2"):
-                    return STATUS_DICT.get(prop[VALUE], 'Unknown')
+        prop = self._device.get_property(self.entity_description.api_param)
+        if prop is not None:
+            # exception
+            # status only from socket 1
+            if (prop.id == "2501_2"):
+                return STATUS_DICT.get(prop.value, 'Unknown')
 
-                if self.entity_description.round_digits is not None:
-                    return round(prop[VALUE], self.entity_description.round_digits)
+            if self.entity_description.round_digits is not None:
+                return round(prop.value, self.entity_description.round_digits)
 
-                return prop[VALUE]
+            return prop.value
 
         return 'Unknown'
 
@@ -1588,9 +1739,9 @@ class AlfenMainSensor(AlfenEntity):
         """Reboot the wallbox."""
         await self._device.reboot_wallbox()
 
-    async def async_update(self):
-        """Update the sensor."""
-        await self._device.async_update()
+    async def async_watch_properties(self, ids, duration, record):
+        """Poll the properties every second for a while."""
+        self._device.watch_properties([api_param.upper() for api_param in ids], duration, record)
 
     @property
     def device_info(self):
@@ -1616,15 +1767,26 @@ class AlfenSensor(AlfenEntity, SensorEntity):
             self._attr_state_class = description.state_class
         if description.device_class is not None:
             self._attr_device_class = description.device_class
+        self._decoder = SENSOR_DECODERS.get(description.key)
 
         self._async_update_attrs()
 
+    @property
+    def api_params(self) -> tuple[str, ...]:
+        """Return the property ids this sensor depends on."""
+        if self.entity_description.api_param is not None:
+            return (self.entity_description.api_param,)
+        return (PROP_TRANSACTION,)
+
     def _get_current_value(self) -> StateType | None:
         """Get the current value."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                return prop[VALUE]
-        return None
+        if self._decoder is None:
+            return self._get_custom_value()
+
+        value = self._device.get_property_value(self.entity_description.api_param)
+        if value is None:
+            return None
+        return self._decoder(value)
 
     @callback
     def _async_update_attrs(self) -> None:
@@ -1649,7 +1811,7 @@ class AlfenSensor(AlfenEntity, SensorEntity):
     @property
     def native_value(self) -> StateType:
         """Return the state of the sensor."""
-        return round(self.state, 2)
+        return self._attr_native_value
 
     @property
     def native_unit_of_measurement(self) -> str | None:
@@ -1657,75 +1819,50 @@ class AlfenSensor(AlfenEntity, SensorEntity):
         return self.entity_description.unit
 
     def _processTransactionKWh(self, socket:str, entity_description:AlfenSensorDescription):
-        if self._device.latest_tag is None:
+        if not self._device.transactions:
             return "Unknown"
+        transaction = self._device.transactions.get(socket)
+        if transaction is None:
+            return None
+
         ## calculate the usage
-        startkWh = None
-        mvkWh = None
-        stopkWh = None
-        lastkWh = None
-
-        for (key,value) in self._device.latest_tag.items():
-            if key[0] == socket and key[1] ==  "start" and key[2] == "kWh":
-                startkWh = value
-                continue
-            if key[0] == socket and key[1] ==  "mv" and key[2] == "kWh":
-                mvkWh = value
-                continue
-            if key[0] == socket and key[1] ==  "stop" and key[2] == "kWh":
-                stopkWh = value
-                continue
-            if key[0] == socket and key[1] ==  "last_start" and key[2] == "kWh":
-                lastkWh = value
-                continue
+        startkWh = transaction.start_kwh
+        mvkWh = transaction.mv_kwh
+        stopkWh = transaction.stop_kwh
+        lastkWh = transaction.last_start_kwh
 
         # if the entity_key end with _charging, then we are calculating the charging
         if startkWh is not None and mvkWh is not None and entity_description.key.endswith('_charging'):
             # if we have stopkWh and it is higher then mvkWh, then we are not charging anymore and we should return 0
-            if stopkWh is not None and float(stopkWh) >= float(mvkWh):
+            if stopkWh is not None and stopkWh >= mvkWh:
                 return 0
-            value = round(float(mvkWh) - float(startkWh), 2)
+            value = round(mvkWh - startkWh, 2)
             if entity_description.round_digits is not None:
                 return round(value, entity_description.round_digits if entity_description.round_digits > 0 else None)
             return value
 
         # if the entity_key end with _charged, then we are calculating the charged
         if lastkWh is not None and stopkWh is not None and entity_description.key.endswith('_charged'):
-            if float(stopkWh) >= float(lastkWh):
-                value =  round(float(stopkWh) - float(lastkWh), 2)
+            if stopkWh >= lastkWh:
+                value =  round(stopkWh - lastkWh, 2)
                 if entity_description.round_digits is not None:
                     return round(value, entity_description.round_digits if entity_description.round_digits > 0 else None)
                 return value
             return None
 
     def _processTransactionTime(self, socket:str, entity_description:AlfenSensorDescription):
-        if self._device.latest_tag is None:
+        if not self._device.transactions:
             return "Unknown"
+        transaction = self._device.transactions.get(socket)
+        if transaction is None:
+            return None
 
-        startDate = None
-        mvDate = None
-        stopDate = None
-        lastDate = None
-
-        for (key,value) in self._device.latest_tag.items():
-            if key[0] == "socket 1" and key[1] ==  "start" and key[2] == "date":
-                startDate = value
-                continue
-            if key[0] == "socket 1" and key[1] ==  "mv" and key[2] == "date":
-                mvDate = value
-                continue
-            if key[0] == "socket 1" and key[1] ==  "stop" and key[2] == "date":
-                stopDate = value
-                continue
-            if key[0] == "socket 1" and key[1] ==  "last_start" and key[2] == "date":
-                lastDate = value
-                continue
+        startDate = transaction.start_date
+        mvDate = transaction.mv_date
+        stopDate = transaction.stop_date
+        lastDate = transaction.last_start_date
 
         if startDate is not None and mvDate is not None and entity_description.key.endswith('_charging_time'):
-            startDate = datetime.datetime.strptime(startDate, '%Y-%m-%d %H:%M:%S')
-            mvDate = datetime.datetime.strptime(mvDate, '%Y-%m-%d %H:%M:%S')
-            stopDate = datetime.datetime.strptime(stopDate, '%Y-%m-%d %H:%M:%S')
-
             # if there is a stopdate greater then startDate, then we are not charging anymore
             if stopDate is not None and stopDate > startDate:
                 return 0
@@ -1738,9 +1875,6 @@ class AlfenSensor(AlfenEntity, SensorEntity):
 
 
         if lastDate is not None and stopDate is not None and entity_description.key.endswith('_charged_time'):
-            lastDate = datetime.datetime.strptime(lastDate, '%Y-%m-%d %H:%M:%S')
-            stopDate = datetime.datetime.strptime(stopDate, '%Y-%m-%d %H:%M:%S')
-
             if stopDate < lastDate:
                 return None
             # return the value in minutes
@@ -1751,12 +1885,10 @@ class AlfenSensor(AlfenEntity, SensorEntity):
 
     def _customTransactionCode(self, socker_number:int):
         if self.entity_description.key == f"custom_tag_socket_{socker_number}":
-            if self._device.latest_tag is None:
+            transaction = self._device.transactions.get(f"socket {socker_number}")
+            if transaction is None or transaction.start_tag is None:
                 return "No Tag"
-            for (key,value) in self._device.latest_tag.items():
-                if key[0] == f"socket {socker_number}" and key[1] ==  "start" and key[2] == "tag":
-                    return value
-            return "No Tag"
+            return transaction.start_tag
 
         if self.entity_description.key in (f"custom_transaction_socket_{socker_number}_charging", f"custom_transaction_socket_{socker_number}_charged"):
             value = self._processTransactionKWh(f"socket {socker_number}", self.entity_description)
@@ -1769,130 +1901,18 @@ class AlfenSensor(AlfenEntity, SensorEntity):
             if value is not None:
                 return value
 
-    @property
-    def state(self) -> StateType:
-        """Return the state of the sensor."""
-        # state of none Api param
-        if self.entity_description.api_param is None:
-            voltage_l1 = None
-            voltage_l2 = None
-            voltage_l3 = None
-            current_l1 = None
-            current_l2 = None
-            current_l3 = None
-
-            for prop in self._device.properties:
-                if prop[ID] == "5221_3":
-                    voltage_l1 = prop[VALUE]
-                if prop[ID] == "5221_4":
-                    voltage_l2 = prop[VALUE]
-                if prop[ID] == "5221_5":
-                    voltage_l3 = prop[VALUE]
-                if prop[ID] == "212F_1":
-                    current_l1 = prop[VALUE]
-                if prop[ID] == "212F_2":
-                    current_l2 = prop[VALUE]
-                if prop[ID] == "212F_3":
-                    current_l3 = prop[VALUE]
-
-            if self.entity_description.key == "smart_meter_l1":
-                if voltage_l1 is not None and current_l1 is not None:
-                    return round(float(voltage_l1) * float(current_l1), 2)
-            if self.entity_description.key == "smart_meter_l2":
-                if voltage_l2 is not None and current_l2 is not None:
-                    return round(float(voltage_l2) * float(current_l2), 2)
-            if self.entity_description.key == "smart_meter_l3":
-                if voltage_l3 is not None and current_l3 is not None:
-                    return round(float(voltage_l3) * float(current_l3), 2)
-            if self.entity_description.key == "smart_meter_total":
-                if voltage_l1 is not None and current_l1 is not None and voltage_l2 is not None and current_l2 is not None and voltage_l3 is not None and current_l3 is not None:
-                    return round((float(voltage_l1) * float(current_l1) + float(voltage_l2) * float(current_l2) + float(voltage_l3) * float(current_l3)), 2)
-
-
-
+    def _get_custom_value(self) -> StateType:
+        """Return the value of a sensor without api param."""
         # Custom code for transaction and tag
         for socketNr in [1,2]:
             value = self._customTransactionCode(socketNr)
             if value is not None:
                 return value
 
-
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                # some exception of return value
-
-                # Display state status
-                if self.entity_description.api_param in ("3190_1", "3191_1"):
-                    if prop[VALUE] == 28:
-                        return "See error Number"
-                    else:
-                        return STATUS_DICT.get(prop[VALUE], 'Unknown')
-
-                # meter_reading from w to kWh
-                if self.entity_description.api_param in ("2221_22", "3221_22"):
-                    return round((prop[VALUE] / 1000), 2)
-
-                # Car PWM Duty cycle %
-                if self.entity_description.api_param == "2511_3":
-                    return round((prop[VALUE] / 100), self.entity_description.round_digits)
-
-                # change milliseconds to HH:MM:SS
-                if self.entity_description.key == "uptime":
-                    return str(datetime.timedelta(milliseconds=prop[VALUE])).split('.', maxsplit=1)[0]
-
-                if self.entity_description.key == "uptime_hours":
-                    result = 0
-                    value = str(datetime.timedelta(milliseconds=prop[VALUE]))
-                    days = value.split(' day')
-                    if len(days) > 1:
-                        result = int(days[0]) * 24
-                        hours = days[1].split(", ")[1].split(
-                            ':', maxsplit=1)[0]
-                    else:
-                        hours = value.split(':', maxsplit=1)[0]
-                    result += int(hours)
-                    return result
-
-                # change milliseconds to d/m/y HH:MM:SS
-                if self.entity_description.api_param in ("2187_0", "2059_0"):
-                    return datetime.datetime.fromtimestamp(prop[VALUE] / 1000).strftime("%d/%m/%Y %H:%M:%S")
-
-                # Allowed phase 1 or Allowed Phase 2
-                if (self.entity_description.api_param == "312E_0") | (self.entity_description.api_param == "312F_0"):
-                    return ALLOWED_PHASE_DICT.get(prop[VALUE], 'Unknown')
-
-                if self.entity_description.round_digits is not None:
-                    return round(prop[VALUE], self.entity_description.round_digits)
-
-                # mode3_state
-                if self.entity_description.api_param in ("2501_4", "2502_4"):
-                    return MODE_3_STAT_DICT.get(prop[VALUE], 'Unknown')
-
-                # Socket CPRO State
-                if self.entity_description.api_param in ("2501_3", "2502_3"):
-                    return POWER_STATES_DICT.get(prop[VALUE], 'Unknown')
-
-                # Main CSM State
-                if self.entity_description.api_param in ("2501_1", "2502_1"):
-                    return MAIN_STATE_DICT.get(prop[VALUE], 'Unknown')
-
-                # OCPP Boot notification
-                if (self.entity_description.api_param == "3600_1"):
-                    return OCPP_BOOT_NOTIFICATION_STATUS_DICT.get(prop[VALUE], 'Unknown')
-
-                # OCPP Boot notification
-                if (self.entity_description.api_param == "2540_0"):
-                    return MODBUS_CONNECTION_STATES_DICT.get(prop[VALUE], 'Unknown')
-
-                # wallbox display message
-                if self.entity_description.api_param in ("3190_2", "3191_2"):
-                    return str(prop[VALUE]) + ': ' + DISPLAY_ERROR_DICT.get(prop[VALUE],  'Unknown')
-
-                # Status code
-                if self.entity_description.api_param in ("2501_2", "2502_2"):
-                    return STATUS_DICT.get(prop[VALUE], 'Unknown')
-
-                return prop[VALUE]
+    @property
+    def state(self) -> StateType:
+        """Return the state of the sensor."""
+        return self._attr_native_value
 
     @property
     def unit_of_measurement(self) -> str:
@@ -10,12 +10,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
-from .const import (
-    ID,
-    SERVICE_DISABLE_PHASE_SWITCHING,
-    SERVICE_ENABLE_PHASE_SWITCHING,
-    VALUE,
-)
+from .const import SERVICE_DISABLE_PHASE_SWITCHING, SERVICE_ENABLE_PHASE_SWITCHING
 from .entity import AlfenEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -123,19 +118,12 @@ class AlfenSwitchSensor(AlfenEntity, SwitchEntity):
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                return True
-        return False
+        return self._device.is_property_available(self.entity_description.api_param)
 
     @property
     def is_on(self) -> bool:
         """Return True if entity is on."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                return prop[VALUE] == 1
-
-        return False
+        return self._device.get_property_value(self.entity_description.api_param) == 1
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the light on."""
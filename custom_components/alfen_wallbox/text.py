@@ -4,7 +4,6 @@ from dataclasses import dataclass
 import logging
 from typing import Final
 
-from homeassistant.components.counter import VALUE
 from homeassistant.components.text import TextEntity, TextEntityDescription, TextMode
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
@@ -12,7 +11,6 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN as ALFEN_DOMAIN
 from .alfen import AlfenDevice
-from .const import ID
 from .entity import AlfenEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -105,10 +103,7 @@ class AlfenText(AlfenEntity, TextEntity):
 
     def _get_current_value(self) -> str | None:
         """Return the current value."""
-        for prop in self._device.properties:
-            if prop[ID] == self.entity_description.api_param:
-                return prop[VALUE]
-        return None
+        return self._device.get_property_value(self.entity_description.api_param)
 
     async def async_set_value(self, value: str) -> None:
         """Update the value."""